@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.abspath(os.path.join(os.path.dirname(__file__),"..")))
+
+from src.feature_engineering import (
+    HouseAge,
+    NeighborhoodPricePerSqft,
+    TotalBathrooms,
+    TotalSquareFootage,
+    YearsSinceRemodel,
+)
+
+
+def make_frame(rows:int,seed:int=42)->pd.DataFrame:
+    '''builds an AmesHousing-like frame holding the input columns of the derived features'''
+    rng=np.random.default_rng(seed)
+    year_built=rng.integers(1880,2010,rows)
+    frame=pd.DataFrame({
+        "Total Bsmt SF":rng.integers(0,3000,rows).astype(np.float64),
+        "1st Flr SF":rng.integers(300,3000,rows),
+        "2nd Flr SF":rng.integers(0,2000,rows),
+        "Yr Sold":rng.integers(2006,2011,rows),
+        "Year Built":year_built,
+        "Year Remod/Add":np.maximum(year_built,rng.integers(1950,2010,rows)),
+        "Full Bath":rng.integers(0,4,rows),
+        "Half Bath":rng.integers(0,3,rows),
+        "Bsmt Full Bath":rng.integers(0,3,rows).astype(np.float64),
+        "Bsmt Half Bath":rng.integers(0,2,rows).astype(np.float64),
+        "Neighborhood":pd.Categorical.from_codes(rng.integers(0,28,rows),[f"N{i}" for i in range(28)]),
+        "Gr Liv Area":rng.integers(300,5000,rows),
+        "SalePrice":rng.integers(30_000,700_000,rows),
+    })
+    frame.loc[frame.sample(frac=0.01,random_state=seed).index,"Total Bsmt SF"]=np.nan
+    return frame
+
+
+def timed(fn,repeat:int)->float:
+    '''returns the best wall clock time of fn over repeat runs'''
+    best=float("inf")
+    for _ in range(repeat):
+        start=time.perf_counter()
+        fn()
+        best=min(best,time.perf_counter()-start)
+    return best
+
+
+@click.command()
+@click.option("--sizes",default="100000,1000000,10000000",help="comma separated row counts")
+@click.option("--repeat",default=3,help="number of timed runs per case")
+def main(sizes:str,repeat:int):
+    """
+    Times the derived-feature kernels over growing frames,the time per row stays flat when they scale linearly.
+    """
+    strategies=[TotalSquareFootage(),HouseAge(),YearsSinceRemodel(),TotalBathrooms(),NeighborhoodPricePerSqft()]
+    for rows in [int(size) for size in sizes.split(",")]:
+        df=make_frame(rows)
+        for strategy in strategies:
+            #compute only,so the timing is the kernel and not the copy of the frame
+            strategy.fit(df)
+            seconds=timed(lambda:strategy.compute(df),repeat)
+            print(f"{rows:>10} rows  {type(strategy).__name__:>26}: {seconds:8.4f}s  {seconds/rows*1e9:6.2f} ns/row")
+
+
+if __name__=="__main__":
+    main()
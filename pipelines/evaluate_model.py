@@ -30,7 +30,6 @@ if __name__ == "__main__":
 import pandas as pd
 import joblib
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.impute import SimpleImputer
 
 def evaluate():
     print("Evaluating the model...")
@@ -43,13 +42,12 @@ def evaluate():
     categorical_columns = X_test.select_dtypes(include=['object']).columns
     numerical_columns = X_test.select_dtypes(exclude=['object']).columns
 
-    # Impute categorical columns with the most frequent value
-    categorical_imputer = SimpleImputer(strategy='most_frequent')
-    X_test[categorical_columns] = categorical_imputer.fit_transform(X_test[categorical_columns])
+    # Impute with the imputers fitted on the training data, refitting on the test set would skew the statistics
+    categorical_imputer = joblib.load("models/categorical_imputer.pkl")
+    X_test[categorical_columns] = categorical_imputer.transform(X_test[categorical_columns])
 
-    # Impute numerical columns with the median value
-    numerical_imputer = SimpleImputer(strategy='median')
-    X_test[numerical_columns] = numerical_imputer.fit_transform(X_test[numerical_columns])
+    numerical_imputer = joblib.load("models/numerical_imputer.pkl")
+    X_test[numerical_columns] = numerical_imputer.transform(X_test[numerical_columns])
 
     # Convert categorical data to numeric codes (same as the training data)
     for col in categorical_columns:
@@ -24,6 +24,11 @@ def trainss():
     numerical_imputer = SimpleImputer(strategy='median')
     X_train[numerical_columns] = numerical_imputer.fit_transform(X_train[numerical_columns])
 
+    # Save the fitted imputers so evaluation and serving reuse the training statistics
+    os.makedirs("models", exist_ok=True)
+    joblib.dump(categorical_imputer, "models/categorical_imputer.pkl")
+    joblib.dump(numerical_imputer, "models/numerical_imputer.pkl")
+
     # Handle non-numeric data by converting categorical data to numeric codes
     for col in categorical_columns:
         X_train[col] = X_train[col].astype("category").cat.codes  # Convert to numeric codes
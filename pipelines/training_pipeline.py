@@ -1,6 +1,6 @@
-from steps.data_splitter_step import data_splitter_step
-from steps.model_building_step import model_building_step
-from steps.model_evaluator_step import model_evaluator_step
+from steps.data_splitter_step import data_split_indices_step,data_splitter_step
+from steps.model_building_step import model_building_from_indices_step,model_building_step
+from steps.model_evaluator_step import model_evaluator_from_indices_step,model_evaluator_step
 from steps.outlier_detection_step import outlier_detection_step
 from steps.data_ingestion_step import data_ingestion_step
 from steps.handle_missing_values_step import handle_missing_values_step
@@ -47,6 +47,38 @@ def ml_pipeline():
     return model
 
 
+@pipeline(
+    model=Model(
+        #the name uniquely identifies this model
+        name="prices_predictor"
+    ),
+)
+
+def ml_pipeline_from_indices():
+    '''define the end to end pipeline with the split stored as row indices into one clean frame'''
+
+    raw_data=data_ingestion_step(
+        file_path="C:/Users/Keerthi/Documents/AiMlasingh/data/archive.zip"
+    )
+    filled_data=handle_missing_values_step(raw_data)
+    engineered_data=feature_engineering_step(
+    filled_data,strategy="log",features=["Gr Liv Area", "SalePrice"]
+    )
+    clean_data=outlier_detection_step(engineered_data,column_name="SalePrice")
+
+    #Data splitting step,only the row positions are stored and the steps below take their rows
+    #from clean_data,so no split copy of the frame becomes an artifact
+    train_indices,test_indices=data_split_indices_step(clean_data,target_column="SalePrice")
+
+    model=model_building_from_indices_step(
+        df=clean_data,train_indices=train_indices,target_column="SalePrice"
+    )
+    evaluation_metrics,mse=model_evaluator_from_indices_step(
+        trained_model=model,df=clean_data,test_indices=test_indices,target_column="SalePrice"
+    )
+    return model
+
+
 if __name__=="__main__":
     #running the pipeline
     run=ml_pipeline()
\ No newline at end of file
@@ -1,8 +1,15 @@
 import logging
+import os
+import weakref
 from abc import ABC,abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+import numpy as np
 import pandas as pd
+from scipy import sparse as sp
 
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold,RepeatedKFold,StratifiedKFold,train_test_split
 
 #setup logging configuration
 logging.basicConfig(level=logging.INFO,format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,6 +33,41 @@ class DataSplittingStrategy(ABC):
         '''
         pass
 
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        '''
+        returns the split as positional row indices instead of copied frames
+
+        parameters:
+        df(pd.DataFrame):the input dataframe to be split
+        target_column(str):the name of the target column
+
+        returns:
+        train_indices,test_indices:integer arrays of row positions,see take_split
+        '''
+        raise NotImplementedError(f"{type(self).__name__} does not support index based splits")
+
+
+def _positions(n_rows:int)->np.ndarray:
+    '''returns the row positions 0..n_rows-1 in the smallest integer type that holds them'''
+    return np.arange(n_rows,dtype=np.int32 if n_rows<np.iinfo(np.int32).max else np.int64)
+
+
+def take_split(df:pd.DataFrame,indices:np.ndarray,target_column:str):
+    '''
+    materializes one split from row positions with a single take
+
+    parameters:
+    df(pd.DataFrame):the frame the indices were computed on
+    indices(np.ndarray):row positions,e.g. from DataSplitter.split_indices
+    target_column(str):the name of the target column
+
+    returns:
+    X,y:the features and the target of the selected rows
+    '''
+    X=df.take(indices)
+    y=X.pop(target_column)
+    return X,y
+
 #concrete strategy for single Train-Test splt 
 #-------------------------
 #this class implements a simple train-test split strategy
@@ -52,13 +94,402 @@ class SimpleTrainTestSplitStrategy(DataSplittingStrategy):
         Returns:
         X_train, X_test, y_train, y_test: The training and testing splits for features and target.
         """
-        logging.info("performing simple train-test split")
-        X=df.drop(columns=[target_column])
-        y=df[target_column]
-        X_train,X_test,y_train,y_test=train_test_split(X,y,test_size=self.test_size,random_state=self.random_state)
+        train_indices,test_indices=self.split_indices(df,target_column)
+        X_train,y_train=take_split(df,train_indices,target_column)
+        X_test,y_test=take_split(df,test_indices,target_column)
         logging.info("Train-test split completed")
         return X_train,X_test,y_train,y_test
 
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        """
+        Splits the row positions,which shuffles exactly like split_data without copying the data.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame to be split.
+        target_column (str): The name of the target column.
+
+        Returns:
+        train_indices, test_indices: Integer arrays of row positions.
+        """
+        logging.info("performing simple train-test split")
+        train_indices,test_indices=train_test_split(
+            _positions(len(df)),test_size=self.test_size,random_state=self.random_state
+        )
+        return train_indices,test_indices
+
+#abstract base class for cross-validation strategies
+#----------------------------------------------------
+#subclasses yield folds of row positions,split_indices returns them as a list and split_data
+#materializes every fold,so a fold costs O(n) integers until its rows are taken
+class CrossValidationSplitStrategy(DataSplittingStrategy):
+    @abstractmethod
+    def _folds(self,positions:np.ndarray,df:pd.DataFrame,target_column:str):
+        '''yields (train,test) arrays indexing into positions'''
+        pass
+
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        '''
+        returns the folds as positional row indices
+
+        parameters:
+        df(pd.DataFrame):the input dataframe to be split
+        target_column(str):the name of the target column
+
+        returns:
+        list:one (train_indices,test_indices) pair of integer arrays per fold
+        '''
+        logging.info(f"performing {type(self).__name__}")
+        positions=_positions(len(df))
+        return [(positions[train],positions[test]) for train,test in self._folds(positions,df,target_column)]
+
+    def split_data(self,df:pd.DataFrame,target_column:str):
+        '''
+        materializes every fold
+
+        parameters:
+        df(pd.DataFrame):the input dataframe to be split
+        target_column(str):the name of the target column
+
+        returns:
+        list:one (X_train,X_test,y_train,y_test) tuple per fold
+        '''
+        folds=[]
+        for train_indices,test_indices in self.split_indices(df,target_column):
+            X_train,y_train=take_split(df,train_indices,target_column)
+            X_test,y_test=take_split(df,test_indices,target_column)
+            folds.append((X_train,X_test,y_train,y_test))
+        return folds
+
+
+#concrete strategy for K-fold cross-validation
+#----------------------------------------------
+class KFoldSplitStrategy(CrossValidationSplitStrategy):
+    def __init__(self,n_splits=5,shuffle=True,random_state=42):
+        """
+        Initializes the KFoldSplitStrategy with specific parameters.
+
+        Parameters:
+        n_splits (int): The number of folds.
+        shuffle (bool): Whether to shuffle the rows before splitting them into folds.
+        random_state (int): The seed used by the random number generator.
+        """
+        self.n_splits=n_splits
+        self.shuffle=shuffle
+        self.random_state=random_state
+
+    def _folds(self,positions:np.ndarray,df:pd.DataFrame,target_column:str):
+        random_state=self.random_state if self.shuffle else None
+        return KFold(self.n_splits,shuffle=self.shuffle,random_state=random_state).split(positions)
+
+
+#concrete strategy for K-fold cross-validation stratified by target bins
+#-------------------------------------------------------------------------
+#the target is cut into quantile bins and every fold receives the same share of each bin,
+#so expensive houses are not concentrated in a few folds
+class StratifiedByPriceBinSplitStrategy(CrossValidationSplitStrategy):
+    def __init__(self,n_splits=5,n_bins=10,shuffle=True,random_state=42):
+        """
+        Initializes the StratifiedByPriceBinSplitStrategy with specific parameters.
+
+        Parameters:
+        n_splits (int): The number of folds.
+        n_bins (int): The number of quantile bins of the target.
+        shuffle (bool): Whether to shuffle the rows of every bin before splitting them into folds.
+        random_state (int): The seed used by the random number generator.
+        """
+        self.n_splits=n_splits
+        self.n_bins=n_bins
+        self.shuffle=shuffle
+        self.random_state=random_state
+
+    def _folds(self,positions:np.ndarray,df:pd.DataFrame,target_column:str):
+        #ranking first gives equal sized bins even when many rows share a price
+        bins=pd.qcut(df[target_column].rank(method="first"),self.n_bins,labels=False)
+        bins=bins.fillna(-1).to_numpy()
+        random_state=self.random_state if self.shuffle else None
+        splitter=StratifiedKFold(self.n_splits,shuffle=self.shuffle,random_state=random_state)
+        return splitter.split(positions,bins)
+
+
+#concrete strategy for repeated K-fold cross-validation
+#--------------------------------------------------------
+class RepeatedKFoldSplitStrategy(CrossValidationSplitStrategy):
+    def __init__(self,n_splits=5,n_repeats=3,random_state=42):
+        """
+        Initializes the RepeatedKFoldSplitStrategy with specific parameters.
+
+        Parameters:
+        n_splits (int): The number of folds of every repetition.
+        n_repeats (int): The number of repetitions,each with a different shuffle.
+        random_state (int): The seed used by the random number generator.
+        """
+        self.n_splits=n_splits
+        self.n_repeats=n_repeats
+        self.random_state=random_state
+
+    def _folds(self,positions:np.ndarray,df:pd.DataFrame,target_column:str):
+        splitter=RepeatedKFold(n_splits=self.n_splits,n_repeats=self.n_repeats,random_state=self.random_state)
+        return splitter.split(positions)
+
+
+#concrete strategy for a time ordered holdout split
+#----------------------------------------------------
+#rows are ordered by sale month,Yr Sold*12+Mo Sold,with one stable argsort that is cached for
+#the frame,so the split and every backtest window are contiguous slices of the permutation found
+#by binary search instead of boolean scans.sales of one month never straddle a split
+class TemporalSplitStrategy(DataSplittingStrategy):
+    def __init__(self,test_size=0.2,year_column="Yr Sold",month_column="Mo Sold"):
+        """
+        Initializes the TemporalSplitStrategy with specific parameters.
+
+        Parameters:
+        test_size (float): The approximate share of the latest rows in the test split.
+        year_column (str): The column holding the sale year.
+        month_column (str): The column holding the sale month,1 to 12.
+        """
+        self.test_size=test_size
+        self.year_column=year_column
+        self.month_column=month_column
+        self._cache=None
+
+    def temporal_order(self,df:pd.DataFrame):
+        """
+        Returns the time order of the rows,computed once per frame.
+
+        The cache holds a weak reference to the frame,so it assumes the frame is not modified in place.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame.
+
+        Returns:
+        order, periods: The row positions in time order and the sorted month index of every position.
+        """
+        if self._cache is not None:
+            frame,order,periods=self._cache
+            if frame() is df and len(order)==len(df):
+                return order,periods
+        years=df[self.year_column].to_numpy(dtype=np.int64)
+        months=df[self.month_column].to_numpy(dtype=np.int64)
+        keys=years*12+(months-1)
+        order=np.argsort(keys,kind="stable").astype(_positions(len(df)).dtype,copy=False)
+        periods=keys[order]
+        self._cache=(weakref.ref(df),order,periods)
+        return order,periods
+
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        """
+        Splits the rows into earlier training rows and later testing rows.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame to be split.
+        target_column (str): The name of the target column.
+
+        Returns:
+        train_indices, test_indices: Integer arrays of row positions in time order.
+        """
+        logging.info("performing temporal train-test split")
+        order,periods=self.temporal_order(df)
+        if len(order)==0:
+            return order,order
+        #move the cut back to the first sale of its month
+        cut=int(np.ceil(len(order)*(1-self.test_size)))
+        cut=int(np.searchsorted(periods,periods[min(cut,len(order)-1)],side="left")) if cut<len(order) else cut
+        return order[:cut],order[cut:]
+
+    def split_data(self,df:pd.DataFrame,target_column:str):
+        """
+        Splits the data into earlier training rows and later testing rows.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame to be split.
+        target_column (str): The name of the target column.
+
+        Returns:
+        X_train, X_test, y_train, y_test: The training and testing splits for features and target.
+        """
+        train_indices,test_indices=self.split_indices(df,target_column)
+        X_train,y_train=take_split(df,train_indices,target_column)
+        X_test,y_test=take_split(df,test_indices,target_column)
+        logging.info("Temporal train-test split completed")
+        return X_train,X_test,y_train,y_test
+
+    def backtest_indices(self,df:pd.DataFrame,n_windows=36,horizon=1,train_periods=None):
+        """
+        Returns rolling-origin backtest windows over the latest months.
+
+        Every window tests the `horizon` months starting at its origin and trains on the months
+        before it,the origins are the last n_windows months of the frame that hold sales.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame.
+        n_windows (int): The number of windows.
+        horizon (int): The number of months tested per window.
+        train_periods (int): The number of months trained on,None uses every earlier month.
+
+        Returns:
+        list: One (train_indices, test_indices) pair per window,oldest origin first.
+        """
+        order,periods=self.temporal_order(df)
+        #walk back over the distinct months by binary search,the periods are sorted
+        origins=[]
+        end=len(periods)
+        while end>0 and len(origins)<n_windows:
+            origins.append(periods[end-1])
+            end=int(np.searchsorted(periods,periods[end-1],side="left"))
+        origins=np.array(origins[::-1],dtype=np.int64)
+        if len(origins) and origins[0]==periods[0]:
+            #a window needs at least one earlier month to train on
+            origins=origins[1:]
+        test_start=np.searchsorted(periods,origins,side="left")
+        test_end=np.searchsorted(periods,origins+horizon,side="left")
+        if train_periods is None:
+            train_start=np.zeros(len(origins),dtype=np.intp)
+        else:
+            train_start=np.searchsorted(periods,origins-train_periods,side="left")
+        return [
+            (order[start:origin],order[origin:end])
+            for start,origin,end in zip(train_start,test_start,test_end)
+        ]
+
+
+#concrete strategy for rolling-origin backtesting
+#--------------------------------------------------
+#the folds of a time series cross-validation,see TemporalSplitStrategy.backtest_indices
+class RollingOriginSplitStrategy(CrossValidationSplitStrategy):
+    def __init__(self,n_windows=36,horizon=1,train_periods=None,year_column="Yr Sold",month_column="Mo Sold"):
+        """
+        Initializes the RollingOriginSplitStrategy with specific parameters.
+
+        Parameters:
+        n_windows (int): The number of windows.
+        horizon (int): The number of months tested per window.
+        train_periods (int): The number of months trained on,None uses every earlier month.
+        year_column (str): The column holding the sale year.
+        month_column (str): The column holding the sale month,1 to 12.
+        """
+        self.n_windows=n_windows
+        self.horizon=horizon
+        self.train_periods=train_periods
+        self.temporal=TemporalSplitStrategy(year_column=year_column,month_column=month_column)
+
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        logging.info(f"performing rolling-origin split with {self.n_windows} windows")
+        return self.temporal.backtest_indices(df,self.n_windows,self.horizon,self.train_periods)
+
+    def _folds(self,positions:np.ndarray,df:pd.DataFrame,target_column:str):
+        return self.split_indices(df,target_column)
+
+
+#feature matrix published once in shared memory
+#------------------------------------------------
+#a dense array or the three arrays of a CSR matrix are copied into shared memory blocks once,
+#workers attach to them through the small picklable handle,so no fold pickles a copy of the data
+class SharedFeatureMatrix:
+    def __init__(self,X):
+        '''
+        publishes the matrix
+
+        parameters:
+        X(np.ndarray or scipy.sparse matrix):the feature matrix or target vector
+        '''
+        self._blocks=[]
+        if sp.issparse(X):
+            X=X.tocsr()
+            self.handle=("csr",X.shape,self._publish(X.data),self._publish(X.indices),self._publish(X.indptr))
+        else:
+            self.handle=("dense",self._publish(np.ascontiguousarray(X)))
+
+    def _publish(self,values:np.ndarray)->tuple:
+        '''copies an array into a new shared memory block and returns its handle'''
+        block=SharedMemory(create=True,size=max(values.nbytes,1))
+        self._blocks.append(block)
+        np.ndarray(values.shape,dtype=values.dtype,buffer=block.buf)[...]=values
+        return (block.name,values.shape,values.dtype.str)
+
+    @staticmethod
+    def _attach_array(handle:tuple,blocks:list)->np.ndarray:
+        name,shape,dtype=handle
+        block=SharedMemory(name=name)
+        blocks.append(block)
+        return np.ndarray(shape,dtype=np.dtype(dtype),buffer=block.buf)
+
+    @staticmethod
+    def attach(handle:tuple):
+        '''
+        attaches to a published matrix without copying it
+
+        parameters:
+        handle(tuple):the handle attribute of the SharedFeatureMatrix
+
+        returns:
+        tuple:the matrix and the list of attached blocks,close the blocks once the matrix and
+              every view of it are released
+        '''
+        blocks=[]
+        if handle[0]=="csr":
+            _,shape,data,indices,indptr=handle
+            arrays=[SharedFeatureMatrix._attach_array(array,blocks) for array in (data,indices,indptr)]
+            matrix=sp.csr_matrix(tuple(arrays),shape=shape,copy=False)
+        else:
+            matrix=SharedFeatureMatrix._attach_array(handle[1],blocks)
+        return matrix,blocks
+
+    def close(self):
+        '''releases the shared memory blocks'''
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks=[]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+
+def _run_fold(fold_function:Callable,X_handle:tuple,y_handle:tuple,train_indices,test_indices,kwargs:dict):
+    '''runs one fold in a worker process on the shared feature matrix and target'''
+    X,X_blocks=SharedFeatureMatrix.attach(X_handle)
+    y,y_blocks=SharedFeatureMatrix.attach(y_handle)
+    result=fold_function(X,y,train_indices,test_indices,**kwargs)
+    del X,y
+    for block in X_blocks+y_blocks:
+        block.close()
+    return result
+
+
+def run_folds(fold_function:Callable,X,y,folds:list,n_jobs:int=None,**kwargs)->list:
+    '''
+    runs a function on every fold in parallel worker processes that share one copy of the data
+
+    parameters:
+    fold_function(Callable):a module level function called as
+                            fold_function(X,y,train_indices,test_indices,**kwargs),its result
+                            must not reference X or y
+    X(np.ndarray or scipy.sparse matrix):the numeric feature matrix
+    y(np.ndarray):the target
+    folds(list):(train_indices,test_indices) pairs,e.g. from split_indices
+    n_jobs(int):number of worker processes,None uses every core and 1 runs in process
+
+    returns:
+    list:the result of every fold,in fold order
+    '''
+    y=np.asarray(y)
+    n_jobs=min(n_jobs or os.cpu_count() or 1,len(folds))
+    if n_jobs<=1:
+        return [fold_function(X,y,train,test,**kwargs) for train,test in folds]
+
+    logging.info(f"running {len(folds)} folds on {n_jobs} workers over a shared feature matrix")
+    with SharedFeatureMatrix(X) as shared_X,SharedFeatureMatrix(y) as shared_y:
+        with ProcessPoolExecutor(max_workers=n_jobs)as executor:
+            futures=[
+                executor.submit(_run_fold,fold_function,shared_X.handle,shared_y.handle,train,test,kwargs)
+                for train,test in folds
+            ]
+            return [future.result() for future in futures]
+
+
 #context class for Data splitting
 #-------------------------------
 #this class uses a DataSplittingStrategy to split the data
@@ -95,6 +526,20 @@ class DataSplitter:
         """
         logging.info("splitting data using the selected strategy")
         return self._strategy.split_data(df,target_column)
+
+    def split_indices(self,df:pd.DataFrame,target_column:str):
+        """
+        Executes the data splitting using the current strategy,returning row positions.
+
+        Parameters:
+        df (pd.DataFrame): The input DataFrame to be split.
+        target_column (str): The name of the target column.
+
+        Returns:
+        train_indices, test_indices: Integer arrays of row positions,see take_split.
+        """
+        logging.info("splitting row indices using the selected strategy")
+        return self._strategy.split_indices(df,target_column)
 # Example usage
 if __name__ == "__main__":
     # Example dataframe (replace with actual data loading)
@@ -0,0 +1,32 @@
+import glob
+import os
+
+
+def trim_to_size(pattern:str,max_size_mb:float):
+    '''
+    removes the least recently used files matching a glob pattern until they fit a size limit
+
+    a file counts as used when its mtime was last refreshed,so a cache touches an entry on every
+    hit.files removed concurrently by another process are skipped
+
+    parameters:
+    pattern(str):glob pattern of the cache entries,e.g. "cache/*.npy"
+    max_size_mb(float):the size the matching files are trimmed back to
+    '''
+    entries=[]
+    for path in glob.glob(pattern):
+        try:
+            stat=os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime,stat.st_size,path))
+    size=sum(entry[1] for entry in entries)
+    limit=max_size_mb*1024*1024
+    for _,entry_size,path in sorted(entries):
+        if size<=limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size-=entry_size
@@ -1,9 +1,14 @@
+import hashlib
+import json
 import logging
+import os
 from abc import ABC,abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler,OneHotEncoder,StandardScaler
+from scipy import sparse as sp
+from src.disk_cache import trim_to_size
 
 #setup logging configuration
 logging.basicConfig(level=logging.INFO,format="%(asctime)s - %(levelname)s - %(message)s")
@@ -26,10 +31,97 @@ class FeatureEngineeringStrategy(ABC):
         '''
         pass
 
+    #column-wise strategies map each feature column to a new column of the same length,
+    #which lets FeaturePipeline run them together on one block of touched columns
+    columnwise=False
+
+    def fit(self,df:pd.DataFrame):
+        '''
+        learns the state of the transformation from training data,stateless strategies learn nothing
+
+        Parameters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        FeatureEngineeringStrategy:the fitted strategy
+        '''
+        if self.columnwise:
+            self.fit_array(df[self.features].to_numpy(dtype=np.float64,copy=True))
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        applies the transformation with the state learned by fit
+
+        Parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.DataFrame:the dataframe with the applied transformation
+        '''
+        if self.columnwise:
+            return self._apply_columnwise(df,fit=False)
+        return self.apply_transformation(df)
+
+    def fit_array(self,values:np.ndarray):
+        '''
+        learns the state of a column-wise strategy from a float block of its features
+
+        Parameters:
+        values(np.ndarray):a (rows,len(features)) float64 block
+        '''
+        pass
+
+    def transform_array(self,values:np.ndarray)->np.ndarray:
+        '''
+        transforms a float block holding the strategy features,only for column-wise strategies
+
+        Parameters:
+        values(np.ndarray):a (rows,len(features)) float64 block,it may be modified in place
+
+        returns:
+        np.ndarray:the transformed block
+        '''
+        raise NotImplementedError(f"{type(self).__name__} is not a column-wise strategy")
+
+    def _apply_columnwise(self,df:pd.DataFrame,fit:bool=True)->pd.DataFrame:
+        '''applies transform_array to the strategy features of a copy of the dataframe'''
+        values=df[self.features].to_numpy(dtype=np.float64,copy=True)
+        if fit:
+            self.fit_array(values)
+        df_transformed=df.copy()
+        df_transformed[self.features]=self.transform_array(values)
+        return df_transformed
+
+    def get_params(self)->dict:
+        '''returns the constructor parameters of the strategy'''
+        return {"features":list(self.features)}
+
+    def get_state(self)->dict:
+        '''returns the fitted state as json serializable lists,empty for stateless strategies'''
+        return {}
+
+    def set_state(self,state:dict):
+        '''restores a fitted state returned by get_state'''
+        pass
+
+    def to_dict(self)->dict:
+        '''returns the strategy name,parameters and fitted state'''
+        return {"strategy":type(self).__name__,"params":self.get_params(),"state":self.get_state()}
+
+    @classmethod
+    def from_dict(cls,data:dict)->"FeatureEngineeringStrategy":
+        '''rebuilds a strategy from the output of to_dict'''
+        strategy=cls(**data["params"])
+        strategy.set_state(data["state"])
+        return strategy
+
 #concrete strategy for Log Transformation
 #---------------------------------------------
 #This strategy applies a logarithmic transformation to skewed features to normalize the distribution.
 class LogTransformation(FeatureEngineeringStrategy):
+    columnwise=True
+
     def __init__(self,features):
         '''
         Initializes the LogTransforamtion with the specific features to transform
@@ -50,18 +142,20 @@ class LogTransformation(FeatureEngineeringStrategy):
         pd.DataFrame:the dataframe with log-transformed feature
         '''
         logging.info(f"Applying log transformed feature:{self.features}")
-        df_transformed=df.copy()
-        for feature in self.features:
-            df_transformed[feature]=np.log1p(
-                df[feature]
-            )#log1p handles log{0} by calculating log(1+x)
+        df_transformed=self._apply_columnwise(df)
         logging.info("Log transformation completed")
         return df_transformed
 
+    def transform_array(self,values:np.ndarray)->np.ndarray:
+        '''applies log1p to the block in place,the transformation has no state'''
+        return np.log1p(values,out=values)#log1p handles log{0} by calculating log(1+x)
+
 #concrete strategy for Standard Scaling
 #--------------------------------------
 #This strategy applies standard scaling(z-score normalization)
 class StandardScaling(FeatureEngineeringStrategy):
+    columnwise=True
+
     def __init__(self,features):
         '''
         Initializes the StandardScaling with the specific features to scale
@@ -70,7 +164,8 @@ class StandardScaling(FeatureEngineeringStrategy):
         features(list):The list of features to apply the Standard Scaling to.
         '''
         self.features=features
-        self.scaler=StandardScaler()
+        self.mean_=None
+        self.scale_=None
         
     def apply_transformation(self, df:pd.DataFrame)->pd.DataFrame:
         '''
@@ -83,15 +178,40 @@ class StandardScaling(FeatureEngineeringStrategy):
         pd.DataFrame:the dataframe with scaled features
         '''
         logging.info(f"Applying standard scaling to features:{self.features}")
-        df_transformed=df.copy()
-        df_transformed[self.features]=self.scaler.fit_transform(df[self.features])
+        df_transformed=self._apply_columnwise(df)
         logging.info("Standard sclaing completed")
         return df_transformed
+
+    def fit_array(self,values:np.ndarray):
+        '''learns the mean and standard deviation of each column,constant columns keep a scale of 1'''
+        self.mean_=np.nanmean(values,axis=0)
+        scale=np.nanstd(values,axis=0)
+        self.scale_=np.where(scale>0,scale,1.0)
+
+    def transform_array(self,values:np.ndarray)->np.ndarray:
+        '''standardizes each column of the block in place'''
+        if self.mean_ is None:
+            raise ValueError("StandardScaling must be fitted before calling transform.")
+        values-=self.mean_
+        values/=self.scale_
+        return values
+
+    def get_state(self)->dict:
+        if self.mean_ is None:
+            return {}
+        return {"mean":self.mean_.tolist(),"scale":self.scale_.tolist()}
+
+    def set_state(self,state:dict):
+        if state:
+            self.mean_=np.asarray(state["mean"],dtype=np.float64)
+            self.scale_=np.asarray(state["scale"],dtype=np.float64)
     
 #concrete strategy for Min-Max Scaling
 #--------------------------------------
 #This strategy applies Min-Max scaling to features,scaling them to a specif range,typically [0,1]
 class MinMaxScaling(FeatureEngineeringStrategy):
+    columnwise=True
+
     def __init__(self,features,feature_range=(0,1)):
         '''
         Initializes the MinMaxScaling with the specific features
@@ -104,7 +224,9 @@ class MinMaxScaling(FeatureEngineeringStrategy):
         feature_range(tuple):the target range for scaling,default is (0,1) 
         '''
         self.features=features
-        self.scaler=MinMaxScaler(feature_range=feature_range)
+        self.feature_range=tuple(feature_range)
+        self.data_min_=None
+        self.data_range_=None
 
     def apply_transformation(self, df:pd. DataFrame)->pd.DataFrame:
         '''
@@ -116,25 +238,56 @@ class MinMaxScaling(FeatureEngineeringStrategy):
         returns:
         pd.DataFrame:the dataframe with Min-Max scaled features
         '''
-        logging.info(f"Applying Min-Max scaling to features:{self.features} with range {self.scaler.feature_range}")
-        df_transformed=df.copy()
-        df_transformed[self.features]=self.scaler.fit_transform(df[self.features])
+        logging.info(f"Applying Min-Max scaling to features:{self.features} with range {self.feature_range}")
+        df_transformed=self._apply_columnwise(df)
         logging.info("Min-Max scaling completed")
         return df_transformed
+
+    def fit_array(self,values:np.ndarray):
+        '''learns the minimum and range of each column,constant columns keep a range of 1'''
+        self.data_min_=np.nanmin(values,axis=0)
+        data_range=np.nanmax(values,axis=0)-self.data_min_
+        self.data_range_=np.where(data_range>0,data_range,1.0)
+
+    def transform_array(self,values:np.ndarray)->np.ndarray:
+        '''scales each column of the block to the feature range in place'''
+        if self.data_min_ is None:
+            raise ValueError("MinMaxScaling must be fitted before calling transform.")
+        low,high=self.feature_range
+        values-=self.data_min_
+        values*=(high-low)/self.data_range_
+        values+=low
+        return values
+
+    def get_params(self)->dict:
+        return {"features":list(self.features),"feature_range":list(self.feature_range)}
+
+    def get_state(self)->dict:
+        if self.data_min_ is None:
+            return {}
+        return {"data_min":self.data_min_.tolist(),"data_range":self.data_range_.tolist()}
+
+    def set_state(self,state:dict):
+        if state:
+            self.data_min_=np.asarray(state["data_min"],dtype=np.float64)
+            self.data_range_=np.asarray(state["data_range"],dtype=np.float64)
     
 #concrete strategy for One-Hot Encoding
 #-----------------------------------------
 #this strategy applies One-Hot Strategy to categorical features
 class OneHotEncoding(FeatureEngineeringStrategy):
-    def __init__(self, features):
+    def __init__(self, features,sparse=False):
         """
         Initializes the OneHotEncoding with the specific features to encode.
 
         Parameters:
         features (list): The list of categorical features to apply the one-hot encoding to.
+        sparse (bool): return the encoded columns as pandas sparse columns,memory then grows with
+                       the number of rows rather than with rows times categories
         """
         self.features = features
-        self.encoder = OneHotEncoder(sparse=False, drop="first")
+        self.sparse=sparse
+        self.categories_=None
 
     def apply_transformation(self, df: pd.DataFrame) -> pd.DataFrame:
         '''
@@ -147,16 +300,904 @@ class OneHotEncoding(FeatureEngineeringStrategy):
         pd.Dataframe:the dataframe with one-hot encoding features
         '''
         logging.info(f"Applying One-hot encoding to features:{self.features}")
-        df_transformed=df.copy()
-        encoded_df=pd.DataFrame(
-            self.encoder.fit_transform(df[self.features]),
-            columns=self.encoder.get_feature_names_out(self.features)
-        )
-        df_transformed=df_transformed.drop(columns=self.features)
-        df_transformed=pd.concat([df_transformed,encoded_df],axis=1)    
+        df_transformed=self.fit(df).transform(df)
         logging.info("One-hot encoding completed")
         return df_transformed
 
+    def fit(self,df:pd.DataFrame):
+        '''learns the sorted category vocabulary of every feature'''
+        self.categories_={
+            feature:pd.Index(df[feature].dropna().unique()).sort_values().tolist()
+            for feature in self.features
+        }
+        return self
+
+    def encode(self,df:pd.DataFrame):
+        '''
+        encodes the features into a csr matrix with the learned vocabulary,dropping the first category
+
+        unknown and missing values encode as all zeros,so every row holds at most one non-zero
+        entry per feature.the entries are uint8,which also gives sparse columns a fill value of 0
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features to encode
+
+        returns:
+        tuple:the (rows,encoded columns) csr matrix and the encoded column names
+        '''
+        if self.categories_ is None:
+            raise ValueError("OneHotEncoding must be fitted before calling transform.")
+        row_index=[]
+        column_index=[]
+        columns=[]
+        rows=np.arange(len(df))
+        for feature in self.features:
+            categories=self.categories_[feature]
+            codes=pd.Categorical(df[feature],categories=categories).codes.astype(np.intp)
+            hit=codes>0
+            row_index.append(rows[hit])
+            column_index.append(codes[hit]-1+len(columns))
+            columns.extend(f"{feature}_{category}" for category in categories[1:])
+        row_index=np.concatenate(row_index) if row_index else np.empty(0,dtype=np.intp)
+        column_index=np.concatenate(column_index) if column_index else np.empty(0,dtype=np.intp)
+        matrix=sp.csr_matrix(
+            (np.ones(len(row_index),dtype=np.uint8),(row_index,column_index)),shape=(len(df),len(columns))
+        )
+        return matrix,columns
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        encodes the features with the learned vocabulary,dropping the first category
+
+        unknown and missing values encode as all zeros
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.Dataframe:the dataframe with one-hot encoding features
+        '''
+        matrix,columns=self.encode(df)
+        if self.sparse:
+            encoded_df=pd.DataFrame.sparse.from_spmatrix(matrix,index=df.index,columns=columns)
+        else:
+            encoded_df=pd.DataFrame(matrix.astype(np.float64).toarray(),columns=columns,index=df.index)
+        df_transformed=df.drop(columns=self.features)
+        return pd.concat([df_transformed,encoded_df],axis=1)
+
+    def get_params(self)->dict:
+        return {"features":list(self.features),"sparse":self.sparse}
+
+    def get_state(self)->dict:
+        return {} if self.categories_ is None else {"categories":self.categories_}
+
+    def set_state(self,state:dict):
+        if state:
+            self.categories_=state["categories"]
+
+def sparse_frame_to_csr(X:pd.DataFrame):
+    '''
+    converts a frame to a scipy CSR matrix,pandas sparse columns without densifying them
+
+    a frame deserialized from a serving payload carries the same columns as plain dense ones,
+    those are converted through a dense array
+
+    parameters:
+    X(pd.DataFrame):the columns to convert
+
+    returns:
+    scipy.sparse.csr_matrix:the same values as a CSR matrix
+    '''
+    if len(X.columns) and all(isinstance(dtype,pd.SparseDtype) for dtype in X.dtypes):
+        return X.sparse.to_coo().tocsr()
+    return sp.csr_matrix(X.to_numpy())
+
+def hash_encode(X:pd.DataFrame,n_features:int=2**12,alternate_sign:bool=True):
+    '''
+    encodes every column of X into a fixed number of hashed columns with the hashing trick
+
+    a value is hashed with pandas' vectorized siphash keyed by its column name,so equal values
+    of different columns land in different buckets.the low bits of the hash pick the bucket and
+    the top bit the sign,which keeps colliding values from adding up in expectation.missing
+    values encode as zeros
+
+    parameters:
+    X(pd.DataFrame):the categorical columns to encode
+    n_features(int):the number of output columns
+    alternate_sign(bool):give every value a hash derived sign instead of always +1
+
+    returns:
+    scipy.sparse.csr_matrix:the (rows,n_features) encoded matrix
+    '''
+    row_index=[]
+    column_index=[]
+    signs=[]
+    rows=np.arange(len(X))
+    for column in X.columns:
+        values=X[column]
+        present=values.notna().to_numpy()
+        hash_key=hashlib.md5(str(column).encode()).hexdigest()[:16]
+        hashes=pd.util.hash_array(values[present].astype(str).to_numpy(dtype=object),hash_key=hash_key)
+        row_index.append(rows[present])
+        column_index.append((hashes%np.uint64(n_features)).astype(np.intp))
+        if alternate_sign:
+            signs.append(1-2*(hashes>>np.uint64(63)).astype(np.int32))
+        else:
+            signs.append(np.ones(len(hashes),dtype=np.int32))
+    #int32 entries give pandas sparse columns a fill value of 0,duplicates are summed by csr
+    matrix=sp.csr_matrix(
+        (
+            np.concatenate(signs) if signs else np.empty(0,dtype=np.int32),
+            (
+                np.concatenate(row_index) if row_index else np.empty(0,dtype=np.intp),
+                np.concatenate(column_index) if column_index else np.empty(0,dtype=np.intp),
+            ),
+        ),
+        shape=(len(X),n_features),
+    )
+    #colliding values of opposite sign cancel,drop the explicit zeros they leave behind
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def hashed_feature_names(transformer,input_features)->list:
+    '''
+    returns the output column names of a FunctionTransformer wrapping hash_encode
+
+    parameters:
+    transformer(FunctionTransformer):the transformer wrapping hash_encode
+    input_features(array-like):the hashed input columns,unused as the width is fixed
+
+    returns:
+    list:one name per hashed column
+    '''
+    n_features=(transformer.kw_args or {}).get("n_features",2**12)
+    return [f"hash_{i}" for i in range(n_features)]
+
+
+#concrete strategy for feature hashing
+#--------------------------------------
+#this strategy encodes high-cardinality categorical features into a fixed number of columns,
+#it learns no vocabulary so unseen categories never need a refit
+class HashingEncoding(FeatureEngineeringStrategy):
+    def __init__(self,features,n_features=2**12,alternate_sign=True,sparse=True,prefix="hash"):
+        '''
+        Initializes the HashingEncoding with the specific features to encode
+
+        parameters:
+        features(list):the list of categorical features to hash
+        n_features(int):the fixed number of output columns shared by all features
+        alternate_sign(bool):give every value a hash derived sign so collisions cancel out in expectation
+        sparse(bool):return the hashed columns as pandas sparse columns
+        prefix(str):prefix of the output column names,e.g. hash_0 ... hash_4095
+        '''
+        self.features=features
+        self.n_features=n_features
+        self.alternate_sign=alternate_sign
+        self.sparse=sparse
+        self.prefix=prefix
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        replaces the specified categorical features with their hashed encoding
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.DataFrame:the dataframe with hashed features
+        '''
+        logging.info(f"Applying feature hashing to features:{self.features} with {self.n_features} columns")
+        matrix=hash_encode(df[self.features],self.n_features,self.alternate_sign)
+        columns=[f"{self.prefix}_{i}" for i in range(self.n_features)]
+        if self.sparse:
+            encoded_df=pd.DataFrame.sparse.from_spmatrix(matrix,index=df.index,columns=columns)
+        else:
+            encoded_df=pd.DataFrame(matrix.astype(np.float64).toarray(),columns=columns,index=df.index)
+        df_transformed=df.drop(columns=self.features)
+        logging.info("Feature hashing completed")
+        return pd.concat([df_transformed,encoded_df],axis=1)
+
+    def get_params(self)->dict:
+        return {
+            "features":list(self.features),
+            "n_features":self.n_features,
+            "alternate_sign":self.alternate_sign,
+            "sparse":self.sparse,
+            "prefix":self.prefix,
+        }
+
+def _column(df:pd.DataFrame,feature:str)->np.ndarray:
+    '''returns a feature as a contiguous float64 array,missing values become NaN,the array may be read-only'''
+    return np.ascontiguousarray(df[feature].to_numpy(dtype=np.float64,na_value=np.nan))
+
+
+#abstract base class for derived features
+#------------------------------------------
+#a derived feature combines several input columns into one new output column with a vectorized
+#numpy kernel over contiguous column arrays,the input columns are kept
+class DerivedFeatureStrategy(FeatureEngineeringStrategy):
+    def __init__(self,features,output):
+        '''
+        Initializes the derived feature
+
+        parameters:
+        features(list):the input columns of the kernel
+        output(str):name of the new column
+        '''
+        self.features=features
+        self.output=output
+
+    @abstractmethod
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        '''
+        computes the derived feature
+
+        parameters:
+        df(pd.DataFrame):the dataframe holding the input columns
+
+        returns:
+        np.ndarray:one float64 value per row
+        '''
+        pass
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        adds the derived feature as a new column
+
+        parameters:
+        df(pd.DataFrame):the dataframe holding the input columns
+
+        returns:
+        pd.DataFrame:the dataframe with the derived column
+        '''
+        logging.info(f"Deriving {self.output} from features:{self.features}")
+        self.fit(df)
+        df_transformed=self.transform(df)
+        logging.info(f"{self.output} derived")
+        return df_transformed
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        df_transformed=df.copy()
+        df_transformed[self.output]=self.compute(df)
+        return df_transformed
+
+    def get_params(self)->dict:
+        return {"features":list(self.features),"output":self.output}
+
+
+#concrete derived feature for total square footage
+#---------------------------------------------------
+#sums the basement and floor areas,a missing area counts as 0
+class TotalSquareFootage(DerivedFeatureStrategy):
+    def __init__(self,features=("Total Bsmt SF","1st Flr SF","2nd Flr SF"),output="Total SF"):
+        super().__init__(list(features),output)
+
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        total=np.zeros(len(df))
+        for feature in self.features:
+            values=_column(df,feature)
+            np.add(total,values,out=total,where=~np.isnan(values))
+        return total
+
+
+#concrete derived feature for the age of the house at sale
+#-----------------------------------------------------------
+class HouseAge(DerivedFeatureStrategy):
+    def __init__(self,features=("Yr Sold","Year Built"),output="House Age"):
+        super().__init__(list(features),output)
+
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        sold,built=self.features
+        return np.subtract(_column(df,sold),_column(df,built))
+
+
+#concrete derived feature for the years between the last remodel and the sale
+#------------------------------------------------------------------------------
+class YearsSinceRemodel(DerivedFeatureStrategy):
+    def __init__(self,features=("Yr Sold","Year Remod/Add"),output="Years Since Remodel"):
+        super().__init__(list(features),output)
+
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        sold,remodeled=self.features
+        return np.subtract(_column(df,sold),_column(df,remodeled))
+
+
+#concrete derived feature for the total number of bathrooms
+#------------------------------------------------------------
+#full bathrooms count 1 and half bathrooms 0.5,a missing count is 0
+class TotalBathrooms(DerivedFeatureStrategy):
+    def __init__(
+        self,
+        features=("Full Bath","Half Bath","Bsmt Full Bath","Bsmt Half Bath"),
+        weights=(1.0,0.5,1.0,0.5),
+        output="Total Bathrooms",
+    ):
+        '''
+        parameters:
+        features(list):the bathroom count columns
+        weights(list):the weight of every count column
+        output(str):name of the new column
+        '''
+        super().__init__(list(features),output)
+        self.weights=list(weights)
+
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        total=np.zeros(len(df))
+        weighted=np.empty(len(df))
+        for feature,weight in zip(self.features,self.weights):
+            values=np.multiply(_column(df,feature),weight,out=weighted)
+            np.add(total,values,out=total,where=~np.isnan(values))
+        return total
+
+    def get_params(self)->dict:
+        return {"features":list(self.features),"weights":self.weights,"output":self.output}
+
+
+#concrete derived feature for the neighborhood price per square foot
+#---------------------------------------------------------------------
+#fit sums price and living area per neighborhood in one bincount each,transform looks the ratio up
+#by category code,unseen neighborhoods get the overall ratio.the ratio is learned from the target,
+#so on training data every row gets the ratio of the other K-1 folds,like TargetEncoding,and
+#test or serving data goes through transform with the full training ratio
+class NeighborhoodPricePerSqft(DerivedFeatureStrategy):
+    def __init__(
+        self,
+        features=("Neighborhood","SalePrice","Gr Liv Area"),
+        output="Neighborhood Price Per SqFt",
+        n_splits=5,
+        random_state=42,
+    ):
+        '''
+        parameters:
+        features(list):the neighborhood,price and living area columns
+        output(str):name of the new column
+        n_splits(int):number of folds of the out-of-fold ratio on training data
+        random_state(int):seed of the fold assignment
+        '''
+        super().__init__(list(features),output)
+        self.n_splits=n_splits
+        self.random_state=random_state
+        self.neighborhoods_=None
+        self.price_per_sqft_=None
+        self.overall_price_per_sqft_=None
+
+    def _sums(self,df:pd.DataFrame):
+        '''learns the neighborhoods and returns the codes,price,area,valid rows and per neighborhood sums'''
+        group,price,area=self.features
+        codes,neighborhoods=pd.factorize(df[group],sort=True)
+        self.neighborhoods_=neighborhoods.tolist()
+        price=_column(df,price)
+        area=_column(df,area)
+        valid=(codes>=0)&~np.isnan(price)&~np.isnan(area)
+        price_sum=np.bincount(codes[valid],weights=price[valid],minlength=len(neighborhoods))
+        area_sum=np.bincount(codes[valid],weights=area[valid],minlength=len(neighborhoods))
+        return codes,price,area,valid,price_sum,area_sum
+
+    @staticmethod
+    def _ratios(price_sum:np.ndarray,area_sum:np.ndarray):
+        '''returns the per neighborhood and the overall price per square foot'''
+        overall=float(price_sum.sum()/area_sum.sum()) if area_sum.sum()>0 else np.nan
+        with np.errstate(invalid="ignore",divide="ignore"):
+            return np.where(area_sum>0,price_sum/area_sum,overall),overall
+
+    def fit(self,df:pd.DataFrame):
+        '''learns the price per square foot of every neighborhood'''
+        *_,price_sum,area_sum=self._sums(df)
+        self.price_per_sqft_,self.overall_price_per_sqft_=self._ratios(price_sum,area_sum)
+        return self
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fits the ratio and derives it out-of-fold for the training data
+
+        the out-of-fold sums are the full data sums minus those of the fold,so a row never sees its
+        own price
+
+        parameters:
+        df(pd.DataFrame):the training dataframe,including the price column
+
+        returns:
+        pd.DataFrame:the dataframe with the derived column
+        '''
+        logging.info(f"Deriving {self.output} out-of-fold over {self.n_splits} folds from features:{self.features}")
+        codes,price,area,valid,price_sum,area_sum=self._sums(df)
+        self.price_per_sqft_,self.overall_price_per_sqft_=self._ratios(price_sum,area_sum)
+
+        n_neighborhoods=len(self.neighborhoods_)
+        folds=np.random.default_rng(self.random_state).permutation(len(df))%self.n_splits
+        derived=np.empty(len(df))
+        for fold in range(self.n_splits):
+            rows=np.flatnonzero(folds==fold)
+            fold_rows=rows[valid[rows]]
+            fold_price=np.bincount(codes[fold_rows],weights=price[fold_rows],minlength=n_neighborhoods)
+            fold_area=np.bincount(codes[fold_rows],weights=area[fold_rows],minlength=n_neighborhoods)
+            ratios,overall=self._ratios(price_sum-fold_price,area_sum-fold_area)
+            #code -1 indexes the appended overall ratio
+            derived[rows]=np.append(ratios,overall)[codes[rows]]
+
+        df_transformed=df.copy()
+        df_transformed[self.output]=derived
+        logging.info(f"{self.output} derived")
+        return df_transformed
+
+    def compute(self,df:pd.DataFrame)->np.ndarray:
+        if self.neighborhoods_ is None:
+            raise ValueError("NeighborhoodPricePerSqft must be fitted before calling transform.")
+        codes=pd.Categorical(df[self.features[0]],categories=self.neighborhoods_).codes
+        lookup=np.append(self.price_per_sqft_,self.overall_price_per_sqft_)
+        #code -1 marks an unseen or missing neighborhood and indexes the overall ratio
+        return lookup[codes]
+
+    def get_params(self)->dict:
+        return {
+            "features":list(self.features),
+            "output":self.output,
+            "n_splits":self.n_splits,
+            "random_state":self.random_state,
+        }
+
+    def get_state(self)->dict:
+        if self.neighborhoods_ is None:
+            return {}
+        return {
+            "neighborhoods":self.neighborhoods_,
+            "price_per_sqft":self.price_per_sqft_.tolist(),
+            "overall_price_per_sqft":self.overall_price_per_sqft_,
+        }
+
+    def set_state(self,state:dict):
+        if state:
+            self.neighborhoods_=state["neighborhoods"]
+            self.price_per_sqft_=np.asarray(state["price_per_sqft"],dtype=np.float64)
+            self.overall_price_per_sqft_=state["overall_price_per_sqft"]
+
+
+def _smoothed_means(sums:np.ndarray,counts:np.ndarray,prior:float,smoothing:float)->np.ndarray:
+    '''blends every category mean with the prior,categories without rows get the prior'''
+    with np.errstate(invalid="ignore",divide="ignore"):
+        means=(sums+smoothing*prior)/(counts+smoothing)
+    return np.where(counts+smoothing>0,means,prior)
+
+
+def _category_statistics(codes:np.ndarray,target:np.ndarray,n_categories:int):
+    '''returns the target sum and row count of every category in one bincount each'''
+    valid=(codes>=0)&~np.isnan(target)
+    sums=np.bincount(codes[valid],weights=target[valid],minlength=n_categories)
+    counts=np.bincount(codes[valid],minlength=n_categories).astype(np.float64)
+    return sums,counts
+
+
+def _encode_fold(codes:np.ndarray,target:np.ndarray,sums:list,counts:list,total:tuple,smoothing:float)->np.ndarray:
+    '''
+    target encodes the rows of one fold with the statistics of all other folds
+
+    the out-of-fold statistics are the full data statistics minus those of the fold,so a worker only
+    needs the rows of its own fold
+
+    parameters:
+    codes(np.ndarray):the (fold rows,features) category codes,-1 for missing or unknown
+    target(np.ndarray):the target of the fold rows
+    sums(list):per feature target sum of every category over all rows
+    counts(list):per feature row count of every category over all rows
+    total(tuple):target sum and count over all rows,the prior is their out-of-fold mean
+    smoothing(float):weight of the prior in every category mean
+
+    returns:
+    np.ndarray:the (fold rows,features) encoded values
+    '''
+    present=~np.isnan(target)
+    total_sum,total_count=total
+    prior=(total_sum-target[present].sum())/max(total_count-present.sum(),1)
+    encoded=np.empty(codes.shape)
+    for j in range(codes.shape[1]):
+        fold_sums,fold_counts=_category_statistics(codes[:,j],target,len(sums[j]))
+        means=_smoothed_means(sums[j]-fold_sums,counts[j]-fold_counts,prior,smoothing)
+        #code -1 indexes the appended prior
+        encoded[:,j]=np.append(means,prior)[codes[:,j]]
+    return encoded
+
+
+#concrete strategy for target encoding
+#---------------------------------------
+#every categorical feature is replaced by one float column holding the smoothed mean target of its
+#category.on training data the means come from the other K-1 folds,so a row never sees its own
+#target,and the folds are encoded in parallel worker processes.transform uses the full data means
+class TargetEncoding(FeatureEngineeringStrategy):
+    def __init__(self,features,target="SalePrice",n_splits=5,smoothing=10.0,n_jobs=1,random_state=42):
+        '''
+        Initializes the TargetEncoding with the specific features to encode
+
+        parameters:
+        features(list):the categorical features to encode
+        target(str):the target column
+        n_splits(int):number of folds of the out-of-fold encoding
+        smoothing(float):weight of the overall mean in every category mean,in rows
+        n_jobs(int):number of worker processes encoding folds,None uses every core and 1 runs in process
+        random_state(int):seed of the fold assignment
+        '''
+        self.features=features
+        self.target=target
+        self.n_splits=n_splits
+        self.smoothing=smoothing
+        self.n_jobs=n_jobs
+        self.random_state=random_state
+        self.categories_=None
+        self.means_=None
+        self.prior_=None
+
+    def _codes(self,df:pd.DataFrame)->np.ndarray:
+        '''returns the (rows,features) category codes under the learned categories'''
+        codes=np.empty((len(df),len(self.features)),dtype=np.intp)
+        for j,feature in enumerate(self.features):
+            codes[:,j]=pd.Categorical(df[feature],categories=self.categories_[feature]).codes
+        return codes
+
+    def _statistics(self,df:pd.DataFrame):
+        '''learns the categories and returns the codes,target and per feature category statistics'''
+        self.categories_={
+            feature:pd.Index(df[feature].dropna().unique()).sort_values().tolist()
+            for feature in self.features
+        }
+        codes=self._codes(df)
+        target=_column(df,self.target)
+        statistics=[
+            _category_statistics(codes[:,j],target,len(self.categories_[feature]))
+            for j,feature in enumerate(self.features)
+        ]
+        return codes,target,[sums for sums,_ in statistics],[counts for _,counts in statistics]
+
+    def _set_means(self,target:np.ndarray,sums:list,counts:list):
+        '''stores the full data encoding used by transform'''
+        self.prior_=float(np.nanmean(target)) if np.any(~np.isnan(target)) else 0.0
+        self.means_={
+            feature:_smoothed_means(sums[j],counts[j],self.prior_,self.smoothing)
+            for j,feature in enumerate(self.features)
+        }
+
+    def fit(self,df:pd.DataFrame):
+        '''learns the full data mean target of every category'''
+        _,target,sums,counts=self._statistics(df)
+        self._set_means(target,sums,counts)
+        return self
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fits the encoding and replaces the features of the training data by their out-of-fold encoding
+
+        parameters:
+        df(pd.DataFrame):the training dataframe,including the target column
+
+        returns:
+        pd.DataFrame:the dataframe with target encoded features
+        '''
+        logging.info(f"Applying {self.n_splits}-fold target encoding to features:{self.features}")
+        codes,target,sums,counts=self._statistics(df)
+        self._set_means(target,sums,counts)
+
+        present=~np.isnan(target)
+        total=(float(target[present].sum()),int(present.sum()))
+        folds=np.random.default_rng(self.random_state).permutation(len(df))%self.n_splits
+        fold_rows=[np.flatnonzero(folds==fold) for fold in range(self.n_splits)]
+        encoded=np.empty(codes.shape)
+        n_jobs=self.n_jobs or os.cpu_count() or 1
+        if n_jobs==1:
+            for rows in fold_rows:
+                encoded[rows]=_encode_fold(codes[rows],target[rows],sums,counts,total,self.smoothing)
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs,self.n_splits))as executor:
+                futures=[
+                    executor.submit(_encode_fold,codes[rows],target[rows],sums,counts,total,self.smoothing)
+                    for rows in fold_rows
+                ]
+                for rows,future in zip(fold_rows,futures):
+                    encoded[rows]=future.result()
+
+        df_transformed=df.copy()
+        for j,feature in enumerate(self.features):
+            df_transformed[feature]=encoded[:,j]
+        logging.info("Target encoding completed")
+        return df_transformed
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''replaces the features by the full data encoding,unseen categories get the overall mean'''
+        if self.means_ is None:
+            raise ValueError("TargetEncoding must be fitted before calling transform.")
+        codes=self._codes(df)
+        df_transformed=df.copy()
+        for j,feature in enumerate(self.features):
+            df_transformed[feature]=np.append(self.means_[feature],self.prior_)[codes[:,j]]
+        return df_transformed
+
+    def get_params(self)->dict:
+        return {
+            "features":list(self.features),
+            "target":self.target,
+            "n_splits":self.n_splits,
+            "smoothing":self.smoothing,
+            "n_jobs":self.n_jobs,
+            "random_state":self.random_state,
+        }
+
+    def get_state(self)->dict:
+        if self.means_ is None:
+            return {}
+        return {
+            "categories":self.categories_,
+            "means":{feature:means.tolist() for feature,means in self.means_.items()},
+            "prior":self.prior_,
+        }
+
+    def set_state(self,state:dict):
+        if state:
+            self.categories_=state["categories"]
+            self.means_={feature:np.asarray(means,dtype=np.float64) for feature,means in state["means"].items()}
+            self.prior_=state["prior"]
+
+
+#composite strategy that plans an ordered list of strategies together
+#--------------------------------------------------------------------
+#consecutive column-wise strategies are fused into one stage:the union of their features is
+#extracted once as a float block,every strategy transforms its slice of the block and the block
+#is written back once,so N chained transforms cost one output copy instead of N
+class FeaturePipeline(FeatureEngineeringStrategy):
+    def __init__(self,strategies:list):
+        '''
+        Initializes the FeaturePipeline with the strategies to apply in order
+
+        Parameters:
+        strategies(list):the FeatureEngineeringStrategy instances to apply
+        '''
+        self.strategies=strategies
+
+    def _stages(self)->list:
+        '''groups the strategies into fused column-wise stages and single structural stages'''
+        stages=[]
+        for strategy in self.strategies:
+            if strategy.columnwise and stages and stages[-1][0]:
+                stages[-1][1].append(strategy)
+            else:
+                stages.append((strategy.columnwise,[strategy]))
+        return stages
+
+    @staticmethod
+    def _run_fused(df_transformed:pd.DataFrame,strategies:list,fit:bool):
+        '''runs column-wise strategies on one block of their touched columns and writes it back'''
+        touched=list(dict.fromkeys(feature for strategy in strategies for feature in strategy.features))
+        position={feature:i for i,feature in enumerate(touched)}
+        block=df_transformed[touched].to_numpy(dtype=np.float64,copy=True)
+        for strategy in strategies:
+            columns=[position[feature] for feature in strategy.features]
+            values=block[:,columns]
+            if fit:
+                strategy.fit_array(values)
+            block[:,columns]=strategy.transform_array(values)
+        df_transformed[touched]=block
+
+    def _run(self,df:pd.DataFrame,fit:bool)->pd.DataFrame:
+        '''applies the stages in order,fitting every strategy on the output of the previous ones when fit is set'''
+        df_transformed=df.copy()
+        for columnwise,strategies in self._stages():
+            if columnwise:
+                self._run_fused(df_transformed,strategies,fit)
+            elif fit:
+                #apply_transformation fits and transforms training data,out-of-fold where it matters
+                df_transformed=strategies[0].apply_transformation(df_transformed)
+            else:
+                df_transformed=strategies[0].transform(df_transformed)
+        return df_transformed
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fits and applies every strategy in order,fusing consecutive column-wise strategies
+
+        Parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.DataFrame:the dataframe with all transformations applied
+        '''
+        logging.info(f"Applying feature pipeline of {len(self.strategies)} strategies")
+        df_transformed=self._run(df,fit=True)
+        logging.info("Feature pipeline completed")
+        return df_transformed
+
+    def fit(self,df:pd.DataFrame):
+        '''fits every strategy on the output of the strategies before it'''
+        self._run(df,fit=True)
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''applies every fitted strategy in order'''
+        return self._run(df,fit=False)
+
+    def get_params(self)->dict:
+        return {"strategies":[strategy.to_dict() for strategy in self.strategies]}
+
+    @classmethod
+    def from_dict(cls,data:dict)->"FeaturePipeline":
+        return cls([strategy_from_dict(strategy) for strategy in data["params"]["strategies"]])
+
+
+def strategy_from_dict(data:dict)->FeatureEngineeringStrategy:
+    '''
+    rebuilds a strategy serialized with FeatureEngineeringStrategy.to_dict
+
+    Parameters:
+    data(dict):the strategy name,parameters and fitted state
+
+    returns:
+    FeatureEngineeringStrategy:the strategy with its fitted state restored
+    '''
+    strategies={cls.__name__:cls for cls in _strategy_classes(FeatureEngineeringStrategy)}
+    if data["strategy"] not in strategies:
+        raise ValueError(f"Unknown feature engineering strategy: {data['strategy']}")
+    return strategies[data["strategy"]].from_dict(data)
+
+
+def _strategy_classes(cls)->list:
+    '''returns every subclass of cls,recursively'''
+    subclasses=[]
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_strategy_classes(subclass))
+    return subclasses
+
+
+def save_strategy(strategy:FeatureEngineeringStrategy,path:str):
+    '''persists a fitted strategy as compact json'''
+    with open(path,"w")as f:
+        json.dump(strategy.to_dict(),f)
+
+
+def load_strategy(path:str)->FeatureEngineeringStrategy:
+    '''loads a strategy persisted with save_strategy'''
+    with open(path)as f:
+        return strategy_from_dict(json.load(f))
+
+
+def column_fingerprint(series:pd.Series)->bytes:
+    '''
+    returns a digest of the column values,independent of its name and index
+
+    numeric columns hash their raw buffer with blake2b,which runs at memory bandwidth,other
+    columns fall back to pandas' per row hashes
+    '''
+    values=series.to_numpy()
+    digest=hashlib.blake2b(digest_size=16)
+    digest.update(f"{values.dtype.str}:{len(values)}".encode())
+    if values.dtype.kind in "biufcmM":
+        digest.update(np.ascontiguousarray(values).view(np.uint8))
+    else:
+        digest.update(pd.util.hash_pandas_object(series,index=False).to_numpy())
+    return digest.digest()
+
+
+#disk-backed LRU store of transformed columns
+#---------------------------------------------
+#every entry is one .npy file named by its key,a hit refreshes the file mtime and writes evict
+#the least recently used files once the store grows past its size limit
+class ColumnCache:
+    def __init__(self,cache_dir:str=".feature_cache",max_size_mb:float=512):
+        '''
+        Initializes the store
+
+        parameters:
+        cache_dir(str):directory holding the cached columns
+        max_size_mb(float):size the store is trimmed back to after every write
+        '''
+        self.cache_dir=cache_dir
+        self.max_size_mb=max_size_mb
+
+    def _path(self,key:str)->str:
+        return os.path.join(self.cache_dir,f"{key}.npy")
+
+    def get(self,key:str):
+        '''returns the cached column,None on a miss'''
+        path=self._path(key)
+        try:
+            values=np.load(path)
+        except (FileNotFoundError,ValueError,OSError):
+            return None
+        os.utime(path)
+        return values
+
+    def put(self,key:str,values:np.ndarray):
+        '''stores a column through a temporary file so readers never see a partial entry'''
+        os.makedirs(self.cache_dir,exist_ok=True)
+        tmp_path=f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path,"wb")as f:
+            np.save(f,values)
+        os.replace(tmp_path,self._path(key))
+        self._evict()
+
+    def _evict(self):
+        '''removes the least recently used entries until the store fits its size limit'''
+        trim_to_size(os.path.join(self.cache_dir,"*.npy"),self.max_size_mb)
+
+
+#decorator strategy memoizing a column-wise strategy per column
+#---------------------------------------------------------------
+#a column is keyed by its fingerprint and the strategy name and parameters,unchanged columns are
+#served from the ColumnCache and only the changed ones are transformed,other strategies run uncached
+class MemoizedFeatureEngineeringStrategy(FeatureEngineeringStrategy):
+    def __init__(self,strategy:FeatureEngineeringStrategy,cache_dir:str=".feature_cache",max_size_mb:float=512):
+        '''
+        Initializes the memoized strategy
+
+        parameters:
+        strategy(FeatureEngineeringStrategy):the wrapped strategy
+        cache_dir(str):directory of the column cache
+        max_size_mb(float):size limit of the column cache
+        '''
+        self.strategy=strategy
+        self.cache=ColumnCache(cache_dir,max_size_mb)
+
+    @property
+    def features(self):
+        return self.strategy.features
+
+    def column_key(self,series:pd.Series)->str:
+        '''returns the cache key of one input column under the wrapped strategy configuration'''
+        params={name:value for name,value in self.strategy.get_params().items() if name!="features"}
+        digest=hashlib.blake2b(column_fingerprint(series),digest_size=20)
+        config={"strategy":type(self.strategy).__name__,"params":params}
+        digest.update(json.dumps(config,sort_keys=True,default=str).encode())
+        return digest.hexdigest()
+
+    def apply_transformation(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        applies the wrapped strategy,reusing cached output columns whose input is unchanged
+
+        the wrapped strategy is not fitted by this method,use fit and transform for a fitted state
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.DataFrame:the dataframe with the applied transformation
+        '''
+        if not self.strategy.columnwise:
+            logging.info(f"{type(self.strategy).__name__} is not column-wise,applying it without the cache")
+            return self.strategy.apply_transformation(df)
+
+        keys={feature:self.column_key(df[feature]) for feature in self.strategy.features}
+        cached={}
+        for feature,key in keys.items():
+            values=self.cache.get(key)
+            if values is not None and len(values)==len(df):
+                cached[feature]=values
+        missing=[feature for feature in self.strategy.features if feature not in cached]
+        logging.info(f"Feature cache:{len(cached)} cached and {len(missing)} recomputed columns")
+
+        df_transformed=df.copy()
+        if missing:
+            #a fresh strategy over the changed columns only,so a stateful strategy fits on exactly them
+            data=self.strategy.to_dict()
+            data["params"]["features"]=missing
+            data["state"]={}
+            strategy=type(self.strategy).from_dict(data)
+            values=df[missing].to_numpy(dtype=np.float64,copy=True)
+            strategy.fit_array(values)
+            values=strategy.transform_array(values)
+            for i,feature in enumerate(missing):
+                self.cache.put(keys[feature],values[:,i])
+                df_transformed[feature]=values[:,i]
+        for feature,values in cached.items():
+            df_transformed[feature]=values
+        return df_transformed
+
+    def fit(self,df:pd.DataFrame):
+        self.strategy.fit(df)
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        return self.strategy.transform(df)
+
+    def to_dict(self)->dict:
+        return self.strategy.to_dict()
+
+
 #context class for feature engineering
 #-------------------------------------------
 #this class uses a FeatureEngineeringStrategy to apply transformations to a  dataset
@@ -191,6 +1232,32 @@ class FeatureEngineer:
         '''
         logging.info("Applying feature engineering strategy")
         return self._strategy.apply_transformation(df)
+
+    def fit(self,df:pd.DataFrame):
+        '''
+        fits the current strategy on the training data
+
+        parameters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        FeatureEngineer:the engineer with a fitted strategy
+        '''
+        logging.info("Fitting feature engineering strategy")
+        self._strategy.fit(df)
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        applies the current strategy with its fitted state
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features to transform
+
+        returns:
+        pd.DataFrame:the dataframe with applied feature engineering transformations
+        '''
+        return self._strategy.transform(df)
     
 #example usage
 if __name__=="__main__":
@@ -1,13 +1,64 @@
+import itertools
+import json
 import logging
 from abc import ABC,abstractmethod
+from functools import partial
+from typing import Iterable
 
+import joblib
+import numpy as np
 import pandas as pd
+from sklearn.neighbors import BallTree,KDTree
+from src.streaming_statistics import FrameStatistics,compute_statistics,tracked_columns
 
 #setup logging configuration-print,ln bcoz in zenml some dont have
 logging.basicConfig(level=logging.INFO,format="%(asctime)s - %(levelname)s - %(message)s")
 
 
 
+def _sorted_modes(block:np.ndarray)->dict:
+    '''
+    returns the mode of every column of a numeric block,the smallest value among ties like
+    Series.mode,columns without values are left out
+
+    the columns are sorted once,equal values then form runs and the first longest run of every
+    column is its mode.NaN sorts last and every NaN is a run of 1,so it never wins over a value
+    '''
+    values=np.sort(block.T,axis=1)
+    n_columns,n_rows=values.shape
+    if n_rows==0:
+        return {}
+    run_start=np.empty(values.shape,dtype=bool)
+    run_start[:,0]=True
+    np.not_equal(values[:,1:],values[:,:-1],out=run_start[:,1:])
+    starts=np.flatnonzero(run_start)
+    counts=np.diff(np.append(starts,values.size))
+    run_columns=starts//n_rows
+    longest=np.maximum.reduceat(counts,np.searchsorted(run_columns,np.arange(n_columns)))
+    hits=np.flatnonzero(counts==longest[run_columns])
+    first=hits[np.r_[True,run_columns[hits][1:]!=run_columns[hits][:-1]]]
+    modes=values.ravel()[starts[first]]
+    present=~np.isnan(values[:,0]) if values.dtype.kind=="f" else np.ones(n_columns,dtype=bool)
+    return {int(j):modes[j] for j in range(n_columns) if present[j]}
+
+
+def _factorized_modes(df:pd.DataFrame,columns)->dict:
+    '''
+    returns the mode of every non-numeric column,the smallest value among ties like Series.mode
+
+    every column is hashed once by factorize and its codes are counted with bincount,only tied
+    values are sorted
+    '''
+    modes={}
+    for column in columns:
+        codes,uniques=pd.factorize(df[column])
+        if len(uniques):
+            #missing values have code -1 and land in the dropped first bin
+            counts=np.bincount(codes+1,minlength=len(uniques)+1)[1:]
+            modes[column]=uniques[counts==counts.max()].sort_values()[0]
+    return modes
+
+
 #abstract base class for missing value handling strategy
 class MissingValueHandlingStrategy(ABC):
     @abstractmethod
@@ -23,6 +74,48 @@ class MissingValueHandlingStrategy(ABC):
         '''
         pass
 
+    def fit(self,df:pd.DataFrame):
+        '''
+        learns the statistics needed to handle missing values,stateless strategies learn nothing
+
+        parameters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        MissingValueHandlingStrategy:the fitted strategy
+        '''
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        handles missing values using the statistics learned by fit
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing missing values
+
+        returns:
+        pd.DataFrame:the dataframe with missing values handled
+        '''
+        return self.handle(df)
+
+    def save(self,path:str):
+        '''persists the strategy,including any fitted statistics'''
+        joblib.dump(self,path)
+
+    @staticmethod
+    def load(path:str)->"MissingValueHandlingStrategy":
+        '''loads a strategy persisted with save,json files hold the compact state of fill strategies'''
+        with open(path,"rb")as f:
+            is_json=f.read(1)==b"{"
+        if not is_json:
+            return joblib.load(path)
+        with open(path)as f:
+            data=json.load(f)
+        strategies={cls.__name__:cls for cls in MissingValueHandlingStrategy.__subclasses__()}
+        if data.get("strategy") not in strategies:
+            raise ValueError(f"Unknown missing value handling strategy: {data.get('strategy')}")
+        return strategies[data["strategy"]].from_dict(data)
+
 #cocrete strategy for dropping missing values
 class DropMissingValuesStrategy(MissingValueHandlingStrategy):
     def __init__(self,axis=0,thresh=None):#to drop rows
@@ -54,51 +147,295 @@ class DropMissingValuesStrategy(MissingValueHandlingStrategy):
 
 #concrete strategy for filling missing values
 class FillMissingValuesStrategy(MissingValueHandlingStrategy):
-    def __init__(self,method="mean",fill_value=None):
+    def __init__(self,method="mean",fill_value=None,inplace=False):
         '''
         intializes the FillMissingValuesStrategy with a specific method
 
         parameters:
-        method(Str):the method to fill missing values('mean','median,mode)
+        method(Str):the method to fill missing values('mean','median,mode,'constant')
         fill_value(any):the constant value to fill missing values 
+        inplace(bool):fill the input dataframe itself instead of returning a filled copy
         '''
         self.method=method
         self.fill_value=fill_value
+        self.inplace=inplace
+        self.fill_values_=None
 
-    def handle(self,df:pd.DataFrame)->pd.DataFrame:
+    def compute_fill_values(self,df:pd.DataFrame,columns=None)->dict:
         '''
-        fills missing vlaues using the specified method or constr
+        computes the fill value of the given columns,by default every column that has missing values
 
-        paramters:
+        a single isna pass finds the columns with missing values so statistics are only
+        computed for those,mean,median and the numeric modes are computed block-wise for all of them at once
+
+        parameters:
         df(pd.DataFrame):the input dataframe containing missing values
-        
+        columns(list):the columns to compute fill values for
+
         returns:
-        pd.DataFrame:the dataframe with missing values handled
+        dict:a mapping of column name to fill value
         '''
-        logging.info(f"Dropping missing values with axis={self.method}")
-        df_cleaned=df.copy()
-        if self.method=="mean":
-            numeric_columns=df_cleaned.select_dtypes(include="number").columns
-            df_cleaned[numeric_columns]=df_cleaned[numeric_columns].fillna(
-                df[numeric_columns].mean()
-            )
-
-        elif self.method=="median":
-            numeric_columns=df_cleaned.select_dtypes(include="number").col
-            df_cleaned[numeric_columns]=df_cleaned[numeric_columns].fillna(
-                df[numeric_columns].median()
-            )
+        if columns is None:
+            columns=df.columns[df.isna().to_numpy().any(axis=0)]
+        missing_columns=pd.Index(columns)
+        if self.method in ("mean","median"):
+            numeric_columns=df[missing_columns].select_dtypes(include="number").columns
+            if self.method=="mean":
+                statistics=df[numeric_columns].mean()
+            else:
+                statistics=df[numeric_columns].median()
+            fill_values=statistics.dropna().to_dict()
         elif self.method=="mode":
-            for column in df_cleaned.columns:
-                df_cleaned[column].fillna(df[column].mode().iloc[0],inplace=True)
+            #numeric columns of one dtype share a block and are sorted together,the rest is
+            #counted over factorized codes
+            dtypes=df[missing_columns].dtypes
+            numeric=dtypes.map(lambda dtype:isinstance(dtype,np.dtype) and dtype.kind in "iuf")
+            fill_values={}
+            for dtype in dtypes[numeric].unique():
+                block_columns=missing_columns[(dtypes==dtype).to_numpy()&numeric.to_numpy()]
+                modes=_sorted_modes(df[block_columns].to_numpy())
+                fill_values.update({block_columns[j]:value for j,value in modes.items()})
+            fill_values.update(_factorized_modes(df,missing_columns[~numeric.to_numpy()]))
+            fill_values={column:fill_values[column] for column in missing_columns if column in fill_values}
         elif self.method=="constant":
-            df_cleaned[column].fillna(self.fill_value)
+            if self.fill_value is None:
+                logging.warning("No fill_value given for the 'constant' method.No missing values handled")
+                return {}
+            fill_values={column:self.fill_value for column in missing_columns}
         else:
             logging.warning(f"Unknown method '{self.method}'.No missing values handled")
+            fill_values={}
+        return fill_values
+
+    def handle(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fills missing vlaues using the specified method or constr
+
+        all fill values are applied in one fillna call,which allocates the output once,
+        or writes into the input when inplace is set
 
+        paramters:
+        df(pd.DataFrame):the input dataframe containing missing values
+        
+        returns:
+        pd.DataFrame:the dataframe with missing values handled
+        '''
+        logging.info(f"Filling missing values with method={self.method}")
+        df_cleaned=self._fill(df,self.compute_fill_values(df))
         logging.info("Missing values filled.")
         return df_cleaned
 
+    def _fill(self,df:pd.DataFrame,fill_values:dict)->pd.DataFrame:
+        '''applies the fill values in one fillna call,in place or on a single copy'''
+        fill_values={column:value for column,value in fill_values.items() if column in df.columns}
+        if self.inplace:
+            df.fillna(value=fill_values,inplace=True)
+            return df
+        return df.fillna(value=fill_values) if fill_values else df.copy()
+
+    def fit(self,df:pd.DataFrame):
+        '''
+        computes the fill value of every column of the training data
+
+        fill values are learned for all columns,not only those missing values in training,
+        so any column missing at inference time is filled with the training statistic
+
+        parameters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        FillMissingValuesStrategy:the fitted strategy
+        '''
+        logging.info(f"Fitting fill values with method={self.method}")
+        self.fill_values_=self.compute_fill_values(df,columns=df.columns)
+        return self
+
+    def fit_chunks(self,chunks:Iterable[pd.DataFrame],n_jobs:int=1):
+        '''
+        computes the fill values in one streaming pass over chunks of the training data
+
+        mean is exact,median comes from a quantile sketch and mode from a bounded heavy hitters
+        counter,all of them merge across worker processes so data larger than memory can be used
+
+        parameters:
+        chunks(Iterable[pd.DataFrame]):the training data,e.g. from DataIngestor.ingest_chunks
+        n_jobs(int):number of worker processes,None uses every core
+
+        returns:
+        FillMissingValuesStrategy:the fitted strategy
+        '''
+        logging.info(f"Fitting fill values over chunks with method={self.method}")
+        chunks=iter(chunks)
+        first_chunk=next(chunks)
+        if self.method=="constant":
+            self.fill_values_=self.compute_fill_values(first_chunk,columns=first_chunk.columns)
+            return self
+        #the columns are settled once here,so every worker tracks the same ones whatever the dtypes
+        #its own chunks parse to
+        columns=tracked_columns(first_chunk,self.method)
+        statistics=compute_statistics(
+            itertools.chain([first_chunk],chunks),
+            partial(FrameStatistics,self.method,columns=columns),
+            n_jobs=n_jobs,
+        )
+        self.fill_values_=statistics.fill_values()
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fills missing values with the fill values learned by fit,no statistics are computed
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing missing values
+
+        returns:
+        pd.DataFrame:the dataframe with missing values handled
+        '''
+        if self.fill_values_ is None:
+            raise ValueError("FillMissingValuesStrategy must be fitted before calling transform.")
+        return self._fill(df,self.fill_values_)
+
+    def to_dict(self)->dict:
+        '''returns the parameters and fill values as json serializable values'''
+        fill_values=None
+        if self.fill_values_ is not None:
+            fill_values={
+                column:value.item() if isinstance(value,np.generic) else value
+                for column,value in self.fill_values_.items()
+            }
+        return {
+            "strategy":type(self).__name__,
+            "params":{"method":self.method,"fill_value":self.fill_value,"inplace":self.inplace},
+            "state":{"fill_values":fill_values},
+        }
+
+    @classmethod
+    def from_dict(cls,data:dict)->"FillMissingValuesStrategy":
+        '''rebuilds a strategy from the output of to_dict'''
+        strategy=cls(**data["params"])
+        strategy.fill_values_=data["state"]["fill_values"]
+        return strategy
+
+    def save(self,path:str):
+        '''persists the parameters and fill values as compact json,reload it with MissingValueHandlingStrategy.load'''
+        with open(path,"w")as f:
+            json.dump(self.to_dict(),f)
+
+#concrete strategy for nearest-neighbour imputation
+#--------------------------------------------------
+#missing target values are filled with the mean of the k most similar complete rows,found
+#with a KD-tree or ball-tree over standardized features,so filling n rows costs O(n log m)
+#instead of comparing every incomplete row with every complete one
+class KNNImputationStrategy(MissingValueHandlingStrategy):
+    def __init__(self,target_columns=None,feature_columns=None,n_neighbors=5,algorithm="auto",
+                 leaf_size=40,batch_size=10000,exclude_columns=None):
+        '''
+        intializes the KNNImputationStrategy
+
+        parameters:
+        target_columns(list):numeric columns to impute,defaults to the numeric columns with missing values
+        feature_columns(list):numeric columns used to find neighbours,defaults to the numeric
+                              columns without missing values
+        n_neighbors(int):the number of neighbours averaged
+        algorithm(str):'kd_tree','ball_tree' or 'auto',which uses a ball-tree above 15 features
+        leaf_size(int):leaf size of the tree
+        batch_size(int):the number of rows queried at once
+        exclude_columns(list):columns left out of the defaults,e.g. the label and row ids,so the
+                              label does not leak into imputation and serving rows without it
+                              can still be transformed
+        '''
+        self.target_columns=target_columns
+        self.feature_columns=feature_columns
+        self.exclude_columns=exclude_columns
+        self.n_neighbors=n_neighbors
+        self.algorithm=algorithm
+        self.leaf_size=leaf_size
+        self.batch_size=batch_size
+        self.index_=None
+
+    def _standardize(self,df:pd.DataFrame)->np.ndarray:
+        '''returns the standardized feature matrix,missing features are set to the training mean'''
+        features=df[self.feature_columns_].to_numpy(dtype=np.float64,na_value=np.nan)
+        features=(features-self.feature_means_)/self.feature_scales_
+        features[np.isnan(features)]=0.0
+        return features
+
+    def fit(self,df:pd.DataFrame):
+        '''
+        builds the neighbour index over the rows whose target columns are all present
+
+        parameters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        KNNImputationStrategy:the fitted strategy
+        '''
+        numeric=df.select_dtypes(include="number")
+        numeric=numeric.drop(columns=numeric.columns.intersection(self.exclude_columns or []))
+        has_missing=numeric.isna().to_numpy().any(axis=0)
+        self.target_columns_=list(self.target_columns or numeric.columns[has_missing])
+        self.feature_columns_=list(self.feature_columns or
+                                   [c for c in numeric.columns[~has_missing] if c not in self.target_columns_])
+        logging.info(f"Fitting KNN imputer for {self.target_columns_} on features {self.feature_columns_}")
+
+        features=df[self.feature_columns_].to_numpy(dtype=np.float64,na_value=np.nan)
+        self.feature_means_=np.nanmean(features,axis=0)
+        scales=np.nanstd(features,axis=0)
+        self.feature_scales_=np.where(scales>0,scales,1.0)
+
+        targets=df[self.target_columns_].to_numpy(dtype=np.float64,na_value=np.nan)
+        donors=~np.isnan(targets).any(axis=1)
+        if donors.sum()<self.n_neighbors:
+            raise ValueError("Not enough complete rows to build the KNN imputation index.")
+        self.donor_targets_=targets[donors]
+
+        algorithm=self.algorithm
+        if algorithm=="auto":
+            algorithm="kd_tree" if len(self.feature_columns_)<=15 else "ball_tree"
+        tree=KDTree if algorithm=="kd_tree" else BallTree
+        self.index_=tree(self._standardize(df)[donors],leaf_size=self.leaf_size)
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fills missing target values from the nearest complete training rows
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing missing values
+
+        returns:
+        pd.DataFrame:the dataframe with missing target values filled
+        '''
+        if self.index_ is None:
+            raise ValueError("KNNImputationStrategy must be fitted before calling transform.")
+        targets=df[self.target_columns_].to_numpy(dtype=np.float64,na_value=np.nan,copy=True)
+        missing=np.isnan(targets)
+        rows=np.flatnonzero(missing.any(axis=1))
+        logging.info(f"Imputing {len(rows)} rows with {self.n_neighbors} nearest neighbours")
+
+        features=self._standardize(df.iloc[rows])
+        for start in range(0,len(rows),self.batch_size):
+            batch=rows[start:start+self.batch_size]
+            _,neighbours=self.index_.query(features[start:start+self.batch_size],k=self.n_neighbors)
+            estimates=self.donor_targets_[neighbours].mean(axis=1)
+            targets[batch]=np.where(missing[batch],estimates,targets[batch])
+
+        df_cleaned=df.copy()
+        df_cleaned[self.target_columns_]=targets
+        return df_cleaned
+
+    def handle(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        fits the neighbour index on the dataframe and fills its missing target values
+
+        parameters:
+        df(pd.DataFrame):the input dataframe containing missing values
+
+        returns:
+        pd.DataFrame:the dataframe with missing values handled
+        '''
+        return self.fit(df).transform(df)
+
 #context class for handling missing vlaues
 class MissingValueHandler:
     def __init__(self,strategy:MissingValueHandlingStrategy):
@@ -117,7 +454,7 @@ class MissingValueHandler:
         '''
 
         logging.info("switching missing values handling strategies")
-        self._strategy=strategy
+        self.strategy=strategy
 
     def handle_missing_values(self,df:pd.DataFrame)->pd.DataFrame:
         '''
@@ -132,6 +469,32 @@ class MissingValueHandler:
         logging.info(f"executing missing value handling stategy")
         return self.strategy.handle(df)
 
+    def fit(self,df:pd.DataFrame):
+        '''
+        fits the current strategy on the training data
+
+        paramters:
+        df(pd.DataFrame):the training dataframe
+
+        returns:
+        MissingValueHandler:the handler with a fitted strategy
+        '''
+        logging.info("fitting missing value handling strategy")
+        self.strategy.fit(df)
+        return self
+
+    def transform(self,df:pd.DataFrame)->pd.DataFrame:
+        '''
+        handles missing values with the statistics learned by fit
+
+        paramters:
+        df(pd.DataFrame):the input dataframe containing missing values
+
+        returns:
+        pd.DataFrame:the dataframe with missing values handled
+        '''
+        return self.strategy.transform(df)
+
 #example usage
 if __name__=="__main__":
     #load the data
@@ -1,7 +1,176 @@
+import fnmatch
+import glob
+import hashlib
+import json
+import logging
 import os
 import zipfile
 from abc import ABC,abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from src.disk_cache import trim_to_size
+
+#setup logging configuration
+logging.basicConfig(level=logging.INFO,format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+#number of rows parsed to estimate the in-memory size of a row
+SAMPLE_ROWS=1000
+
+
+def chunksize_for_memory(sample:pd.DataFrame,max_memory_mb:float)->int:
+    '''
+    returns the number of rows per chunk that keeps a chunk under the memory target
+
+    parameters:
+    sample(pd.DataFrame):a sample of parsed rows used to estimate the bytes per row
+    max_memory_mb(float):the peak memory target for one chunk in megabytes
+
+    returns:
+    int:the number of rows per chunk
+    '''
+    bytes_per_row=max(sample.memory_usage(deep=True).sum()/max(len(sample),1),1)
+    return max(int(max_memory_mb*2**20/bytes_per_row),1)
+
+
+#integer types tried in order when downcasting integer columns
+INTEGER_DTYPES=["int8","int16","int32"]
+
+
+def infer_schema(df:pd.DataFrame,max_category_ratio:float=0.5)->dict:
+    '''
+    infers a compact dtype for every column of a parsed dataframe
+
+    integer columns get the smallest signed integer type that holds their range,
+    float columns become float32 and string columns whose number of distinct values
+    is at most max_category_ratio of the rows become category
+
+    parameters:
+    df(pd.DataFrame):a parsed dataframe with default dtypes
+    max_category_ratio(float):the largest distinct-to-rows ratio converted to category
+
+    returns:
+    dict:a mapping of column name to dtype name
+    '''
+    schema={}
+    for column in df.columns:
+        series=df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            low,high=series.min(),series.max()
+            for dtype in INTEGER_DTYPES:
+                info=np.iinfo(dtype)
+                if info.min<=low and high<=info.max:
+                    schema[column]=dtype
+                    break
+        elif pd.api.types.is_float_dtype(series):
+            schema[column]="float32"
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique()<=max_category_ratio*len(series):
+                schema[column]="category"
+    return schema
+
+
+def save_schema(schema:dict,schema_path:str):
+    '''persists a schema as json'''
+    with open(schema_path,"w")as f:
+        json.dump(schema,f,indent=2,sort_keys=True)
+
+
+def load_schema(schema_path:str)->dict:
+    '''loads a schema persisted with save_schema'''
+    with open(schema_path)as f:
+        return json.load(f)
+
+
+def parse_dtypes(schema:dict)->dict:
+    '''
+    returns the part of a schema that is safe to hand to the csv parser
+
+    integer downcasts are left out because the parser silently wraps values that do not
+    fit the declared type,they are applied afterwards by apply_schema with a range check
+    '''
+    return {column:dtype for column,dtype in schema.items() if dtype not in INTEGER_DTYPES}
+
+
+def apply_schema(df:pd.DataFrame,schema:dict)->pd.DataFrame:
+    '''
+    casts the columns of a dataframe to the dtypes declared in the schema
+
+    integer columns are only downcast when their values fit the declared type,
+    integer columns that picked up missing values are stored as float32 instead
+
+    parameters:
+    df(pd.DataFrame):the dataframe to compact,modified in place
+    schema(dict):a mapping of column name to dtype name
+
+    returns:
+    pd.DataFrame:the compacted dataframe
+    '''
+    for column,dtype in schema.items():
+        if column not in df.columns or df[column].dtype==dtype:
+            continue
+        series=df[column]
+        if dtype in INTEGER_DTYPES:
+            if pd.api.types.is_integer_dtype(series):
+                info=np.iinfo(dtype)
+                if info.min<=series.min() and series.max()<=info.max:
+                    df[column]=series.astype(dtype)
+                else:
+                    logging.warning(f"Column '{column}' does not fit {dtype},keeping {series.dtype}")
+            elif pd.api.types.is_float_dtype(series):
+                df[column]=series.astype("float32")
+        else:
+            df[column]=series.astype(dtype)
+    return df
+
+
+def concat_frames(frames:list)->pd.DataFrame:
+    '''
+    concatenates dataframes parsed from different sources into one frame with a consistent schema
+
+    category columns are given the union of their categories first,otherwise pandas
+    falls back to object dtype when the per-source categories differ
+
+    parameters:
+    frames(list):the dataframes to concatenate
+
+    returns:
+    pd.DataFrame:the concatenated dataframe with a fresh range index
+    '''
+    frames=[df for df in frames if df is not None]
+    if len(frames)==1:
+        return frames[0].reset_index(drop=True)
+    columns=list(dict.fromkeys(column for df in frames for column in df.columns))
+    for column in columns:
+        parts=[df[column] for df in frames if column in df.columns]
+        if all(isinstance(part.dtype,pd.CategoricalDtype) for part in parts):
+            categories=pd.Index(list(dict.fromkeys(value for part in parts for value in part.cat.categories)))
+            for df in frames:
+                if column in df.columns:
+                    df[column]=df[column].cat.set_categories(categories)
+    return pd.concat(frames,ignore_index=True)
+
+
+def _write_arrow(df:pd.DataFrame,path:str):
+    '''writes an uncompressed Arrow file through a temporary file so readers never see a partial file'''
+    os.makedirs(os.path.dirname(path) or ".",exist_ok=True)
+    tmp_path=f"{path}.{os.getpid()}.tmp"
+    table=pa.Table.from_pandas(df.reset_index(drop=True),preserve_index=False)
+    feather.write_feather(table,tmp_path,compression="uncompressed")
+    os.replace(tmp_path,path)
+
+
+def _read_arrow(path:str)->pd.DataFrame:
+    '''reads an Arrow file written by _write_arrow through a memory map'''
+    return feather.read_table(path,memory_map=True).to_pandas(split_blocks=True)
 
 
 #define an abstract class for data ingestor
@@ -11,43 +180,489 @@ class DataIngestor(ABC):
         '''Abstract method to ingest data from a given file.'''
         pass
 
+    def ingest_chunks(self,file_path:str,chunksize:int=None,max_memory_mb:float=None)->Iterator[pd.DataFrame]:
+        '''
+        yields the data of a given file as consecutive dataframe chunks
+
+        the default implementation materializes the full frame and slices it,ingestors
+        that can parse incrementally override this to keep memory bounded
+
+        parameters:
+        file_path(str):the file to ingest
+        chunksize(int):the number of rows per chunk
+        max_memory_mb(float):peak memory target per chunk,used when chunksize is None
+
+        returns:
+        Iterator[pd.DataFrame]:the chunks in file order
+        '''
+        df=self.ingest(file_path)
+        if chunksize is None:
+            chunksize=chunksize_for_memory(df.head(SAMPLE_ROWS),max_memory_mb) if max_memory_mb else len(df)
+        for start in range(0,len(df),max(chunksize,1)):
+            yield df.iloc[start:start+chunksize]
+
 
 class ZipDataIngestor(DataIngestor):
+    def __init__(self,member:str=None,schema:dict=None,**read_csv_kwargs):
+        '''
+        Initializes the ZipDataIngestor with the archive member to read
+
+        parameters:
+        member(str):name or glob pattern of the csv member inside the archive,
+                    if None the archive must contain exactly one csv file
+        schema(dict):optional mapping of column name to compact dtype applied while parsing
+        read_csv_kwargs:extra keyword arguments passed to pd.read_csv
+        '''
+        self.member=member
+        self.schema=schema
+        self.read_csv_kwargs=read_csv_kwargs
+
+    def _read_csv(self,csv_file,**kwargs):
+        '''runs pd.read_csv on an open member,applying the schema when one is set'''
+        if self.schema:
+            kwargs["dtype"]=parse_dtypes(self.schema)
+        result=pd.read_csv(csv_file,**kwargs,**self.read_csv_kwargs)
+        if not self.schema or "chunksize" in kwargs:
+            return result
+        return apply_schema(result,self.schema)
+
+    def _resolve_member(self,zip_ref:zipfile.ZipFile)->str:
+        '''returns the name of the csv member to read from the open archive'''
+        names=[name for name in zip_ref.namelist() if not name.endswith("/")]
+        if self.member is None:
+            csv_files=[name for name in names if name.endswith(".csv")]
+        else:
+            csv_files=[name for name in names if name==self.member or fnmatch.fnmatch(name,self.member)]
+
+        if len(csv_files)==0:
+            raise FileNotFoundError("No CSV file found in the zip archive")
+        if len(csv_files)>1:
+            raise ValueError("Multiple CSV files found,Please specify which one to use.")
+        return csv_files[0]
+
     def ingest(self,file_path:str) -> pd.DataFrame:
-        '''Extracts a .zip file and returns the content as a pandas data frame.'''
+        '''Streams the csv member of a .zip file into pandas without extracting it to disk.'''
         #ensure the file is a .zip
         if not file_path.endswith(".zip"):
             raise ValueError("The provided file is not a .zip file.")
 
+        #decompress the csv member straight into the parser,no temporary file is written
+        with zipfile.ZipFile(file_path,"r")as zip_ref:
+            csv_member=self._resolve_member(zip_ref)
+            with zip_ref.open(csv_member)as csv_file:
+                df=self._read_csv(csv_file)
+
+        #return the dataframe
+        return df
+
+    def ingest_chunks(self,file_path:str,chunksize:int=None,max_memory_mb:float=None)->Iterator[pd.DataFrame]:
+        '''
+        Streams the csv member of a .zip file as dataframe chunks of bounded size
+
+        parameters:
+        file_path(str):the .zip file to ingest
+        chunksize(int):the number of rows per chunk
+        max_memory_mb(float):peak memory target per chunk,used to derive chunksize when it is None
+
+        returns:
+        Iterator[pd.DataFrame]:the chunks in file order
+        '''
+        if not file_path.endswith(".zip"):
+            raise ValueError("The provided file is not a .zip file.")
+        if chunksize is None and max_memory_mb is None:
+            raise ValueError("Either chunksize or max_memory_mb must be provided.")
 
-        #extract the zip file
         with zipfile.ZipFile(file_path,"r")as zip_ref:
-            zip_ref.extractall("extracted_data")
+            csv_member=self._resolve_member(zip_ref)
 
-        #find the extracted csv file (assuming there is one csv file inside the zip.)
-        extracted_files=os.listdir("extracted_data")
-        csv_files=[f for f in extracted_files if f.endswith(".csv")]
+            #estimate the row size from a small sample when only a memory target is given
+            if chunksize is None:
+                with zip_ref.open(csv_member)as csv_file:
+                    sample=self._read_csv(csv_file,nrows=SAMPLE_ROWS)
+                chunksize=chunksize_for_memory(sample,max_memory_mb)
+                logging.info(f"using chunksize={chunksize} for a {max_memory_mb}MB memory target")
 
-        if len(csv_files)==0:
-            raise FileNotFoundError("No CSV file found in the extracted data")
-        if len(csv_files)>1:
-            raise ValueError("Multiple CSV files found,Please specify which one to use.")
+            with zip_ref.open(csv_member)as csv_file:
+                with self._read_csv(csv_file,chunksize=chunksize)as reader:
+                    for chunk in reader:
+                        yield apply_schema(chunk,self.schema) if self.schema else chunk
 
-        #Read the csv into a data frame
-        csv_file_path=os.path.join("extracted_data",csv_files[0])
-        df=pd.read_csv(csv_file_path)
 
-        #return the dataframe
+#base class for columnar ingestors built on pyarrow datasets
+#-----------------------------------------------------------
+#only the projected columns are decoded and the row filter is pushed down into the scan,
+#so parquet row groups whose statistics rule out the predicate are never read
+class ColumnarDataIngestor(DataIngestor):
+    #pyarrow dataset format and partitioning used by the concrete ingestors
+    format=None
+    partitioning=None
+
+    def __init__(self,columns:list=None,filters:list=None,schema:dict=None):
+        '''
+        Initializes the columnar ingestor with a projection and a row filter
+
+        parameters:
+        columns(list):the columns to read,None reads every column
+        filters(list):row filter in (column,op,value) form,e.g. [("Yr Sold",">=",2008)],
+                      a list of such lists is read as an OR of ANDs
+        schema(dict):optional mapping of column name to compact dtype applied after reading
+        '''
+        self.columns=columns
+        self.filters=filters
+        self.schema=schema
+
+    def _dataset(self,file_path:str)->ds.Dataset:
+        '''opens the file or directory as a pyarrow dataset'''
+        return ds.dataset(file_path,format=self.format,partitioning=self.partitioning)
+
+    def _filter_expression(self):
+        '''converts the filters to a pyarrow expression'''
+        if not self.filters:
+            return None
+        #json step parameters arrive as lists,pyarrow expects tuples for the predicates
+        if isinstance(self.filters[0][0],(list,tuple)):
+            filters=[[tuple(predicate) for predicate in group] for group in self.filters]
+        else:
+            filters=[tuple(predicate) for predicate in self.filters]
+        return pq.filters_to_expression(filters)
+
+    def _to_pandas(self,table:pa.Table)->pd.DataFrame:
+        '''converts a table to pandas,applying the schema when one is set'''
+        df=table.to_pandas(split_blocks=True)
+        return apply_schema(df,self.schema) if self.schema else df
+
+    def ingest(self,file_path:str)->pd.DataFrame:
+        '''reads the projected columns of the rows that match the filter'''
+        table=self._dataset(file_path).to_table(columns=self.columns,filter=self._filter_expression())
+        return self._to_pandas(table)
+
+    def ingest_chunks(self,file_path:str,chunksize:int=None,max_memory_mb:float=None)->Iterator[pd.DataFrame]:
+        '''streams the projected and filtered rows as record batches of at most chunksize rows'''
+        dataset=self._dataset(file_path)
+        if chunksize is None:
+            if max_memory_mb is None:
+                raise ValueError("Either chunksize or max_memory_mb must be provided.")
+            sample=dataset.head(SAMPLE_ROWS,columns=self.columns,filter=self._filter_expression())
+            chunksize=chunksize_for_memory(self._to_pandas(sample),max_memory_mb)
+        for batch in dataset.to_batches(columns=self.columns,filter=self._filter_expression(),batch_size=chunksize):
+            if batch.num_rows:
+                yield self._to_pandas(pa.Table.from_batches([batch]))
+
+
+class ParquetDataIngestor(ColumnarDataIngestor):
+    format="parquet"
+
+
+class FeatherDataIngestor(ColumnarDataIngestor):
+    format="feather"
+
+
+#reads a directory of parquet files partitioned as column=value sub directories
+class PartitionedParquetDataIngestor(ColumnarDataIngestor):
+    format="parquet"
+    partitioning="hive"
+
+
+#wrapper ingestor that caches parsed frames as memory-mapped Arrow files
+#-----------------------------------------------------------------------
+#the cache key is the content hash of the source file plus the parse options of the wrapped
+#ingestor,so an unchanged archive is never parsed twice.a hit refreshes the file mtime and
+#writes evict the least recently used entries once the cache grows past its size limit
+class CachedDataIngestor(DataIngestor):
+    def __init__(self,ingestor:DataIngestor,cache_dir:str=".ingest_cache",max_size_mb:float=1024):
+        '''
+        Initializes the CachedDataIngestor around another DataIngestor
+
+        parameters:
+        ingestor(DataIngestor):the ingestor used to parse the file on a cache miss
+        cache_dir(str):directory holding the cached Arrow files
+        max_size_mb(float):size the cache is trimmed back to after every write
+        '''
+        self.ingestor=ingestor
+        self.cache_dir=cache_dir
+        self.max_size_mb=max_size_mb
+
+    @staticmethod
+    def _file_digest(file_path:str,block_size:int=1<<20)->str:
+        '''returns the sha256 hex digest of the file contents'''
+        digest=hashlib.sha256()
+        with open(file_path,"rb")as f:
+            for block in iter(lambda:f.read(block_size),b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def cache_key(self,file_path:str)->str:
+        '''returns the cache key for the file and the parse options of the wrapped ingestor'''
+        options=json.dumps(
+            {"ingestor":type(self.ingestor).__name__,"options":vars(self.ingestor)},
+            sort_keys=True,default=str,
+        )
+        digest=hashlib.sha256(self._file_digest(file_path).encode())
+        digest.update(options.encode())
+        return digest.hexdigest()
+
+    def _evict(self):
+        '''removes the least recently used entries until the cache fits its size limit'''
+        #only cache keys match,history files of an IncrementalDataIngestor sharing the directory stay
+        trim_to_size(os.path.join(self.cache_dir,"[0-9a-f]"*64+".arrow"),self.max_size_mb)
+
+    def ingest(self,file_path:str)->pd.DataFrame:
+        '''returns the cached frame for the file,parsing and caching it on a miss'''
+        cache_path=os.path.join(self.cache_dir,f"{self.cache_key(file_path)}.arrow")
+
+        if os.path.exists(cache_path):
+            logging.info(f"ingestion cache hit:{cache_path}")
+            df=_read_arrow(cache_path)
+            os.utime(cache_path)
+            return df
+
+        logging.info(f"ingestion cache miss,parsing {file_path}")
+        df=self.ingestor.ingest(file_path)
+
+        #written through a temporary file so concurrent runs never read a partial cache entry
+        _write_arrow(df,cache_path)
+        self._evict()
         return df
 
+    def ingest_chunks(self,file_path:str,chunksize:int=None,max_memory_mb:float=None)->Iterator[pd.DataFrame]:
+        '''yields chunks from the memory-mapped cache entry,or from the wrapped ingestor on a miss'''
+        cache_path=os.path.join(self.cache_dir,f"{self.cache_key(file_path)}.arrow")
+        if not os.path.exists(cache_path):
+            yield from self.ingestor.ingest_chunks(file_path,chunksize=chunksize,max_memory_mb=max_memory_mb)
+            return
+
+        #slices of a memory-mapped table only page in the rows that are converted
+        table=feather.read_table(cache_path,memory_map=True)
+        os.utime(cache_path)
+        if chunksize is None:
+            if max_memory_mb is None:
+                raise ValueError("Either chunksize or max_memory_mb must be provided.")
+            chunksize=chunksize_for_memory(table.slice(0,SAMPLE_ROWS).to_pandas(),max_memory_mb)
+        for start in range(0,table.num_rows,chunksize):
+            yield table.slice(start,chunksize).to_pandas(split_blocks=True)
+
+
+
+def _ingest_source(file_path:str,member:str,options:dict)->pd.DataFrame:
+    '''parses one source in a worker process,kept at module level so it can be pickled'''
+    file_extension="" if os.path.isdir(file_path) else os.path.splitext(file_path)[1]
+    if member is not None:
+        options=dict(options,member=member)
+    return DataIngestorFactory.get_data_ingestor(file_extension,**options).ingest(file_path)
+
+
+#ingestor for many archives,or many csv members of one archive,parsed in parallel
+#----------------------------------------------------------------------------------
+#each source is parsed in its own worker process and the results are concatenated with a
+#column naming the source each row came from
+class MultiSourceDataIngestor(DataIngestor):
+    def __init__(self,member:str=None,source_column:str="source",n_jobs:int=None,**options):
+        '''
+        Initializes the MultiSourceDataIngestor
+
+        parameters:
+        member(str):glob pattern of the csv members to read from each archive,defaults to every csv file
+        source_column(str):name of the column recording the source of each row
+        n_jobs(int):number of worker processes,defaults to the number of cores
+        options:keyword arguments passed to the ingestor of every source,e.g. schema
+        '''
+        self.member=member
+        self.source_column=source_column
+        self.n_jobs=n_jobs
+        self.options=options
+
+    def sources(self,file_path:str)->list:
+        '''
+        expands a glob pattern of files,or a single archive,into (file,member) pairs
+
+        parameters:
+        file_path(str):a glob pattern such as "data/*.zip" or the path of one archive
+
+        returns:
+        list:sorted (file_path,member) pairs,member is None for non archive sources
+        '''
+        sources=[]
+        for path in sorted(glob.glob(file_path)):
+            if not path.endswith(".zip"):
+                sources.append((path,None))
+                continue
+            pattern=self.member or "*.csv"
+            with zipfile.ZipFile(path,"r")as zip_ref:
+                members=[name for name in zip_ref.namelist()
+                         if not name.endswith("/") and (name==pattern or fnmatch.fnmatch(name,pattern))]
+            sources.extend((path,name) for name in sorted(members))
+        if len(sources)==0:
+            raise FileNotFoundError(f"No sources found for {file_path}")
+        return sources
+
+    @staticmethod
+    def _source_name(file_path:str,member:str)->str:
+        '''returns the label written to the source column for a source'''
+        name=os.path.basename(os.path.normpath(file_path))
+        return name if member is None else f"{name}:{member}"
+
+    def _tag(self,df:pd.DataFrame,file_path:str,member:str)->pd.DataFrame:
+        '''adds the source column to a parsed frame'''
+        df[self.source_column]=pd.Categorical.from_codes(
+            np.zeros(len(df),dtype=np.int8),categories=[self._source_name(file_path,member)]
+        )
+        return df
+
+    def ingest(self,file_path:str)->pd.DataFrame:
+        '''parses every source in parallel and returns one concatenated dataframe'''
+        sources=self.sources(file_path)
+        n_jobs=min(self.n_jobs or os.cpu_count() or 1,len(sources))
+        logging.info(f"ingesting {len(sources)} sources with {n_jobs} workers")
+
+        if n_jobs==1:
+            frames=[_ingest_source(path,member,self.options) for path,member in sources]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs)as executor:
+                futures=[executor.submit(_ingest_source,path,member,self.options) for path,member in sources]
+                frames=[future.result() for future in futures]
+
+        frames=[self._tag(df,path,member) for df,(path,member) in zip(frames,sources)]
+        return concat_frames(frames)
+
+    def ingest_chunks(self,file_path:str,chunksize:int=None,max_memory_mb:float=None)->Iterator[pd.DataFrame]:
+        '''streams the sources one after another,chunk by chunk'''
+        for path,member in self.sources(file_path):
+            file_extension=os.path.splitext(path)[1]
+            options=self.options if member is None else dict(self.options,member=member)
+            ingestor=DataIngestorFactory.get_data_ingestor(file_extension,**options)
+            for chunk in ingestor.ingest_chunks(path,chunksize=chunksize,max_memory_mb=max_memory_mb):
+                yield self._tag(chunk,path,member)
+
+
+#ingestor that only parses the rows appended since the previous run
+#-------------------------------------------------------------------
+#the parsed history is kept as an Arrow file next to a json manifest holding the high-water
+#mark,csv archives resume from the recorded byte offset of the member and columnar sources
+#push a watermark predicate into the scan
+class IncrementalDataIngestor(DataIngestor):
+    def __init__(self,ingestor:DataIngestor,state_dir:str=".ingest_cache",watermark_column:str="Order"):
+        '''
+        Initializes the IncrementalDataIngestor around another DataIngestor
+
+        parameters:
+        ingestor(DataIngestor):the ingestor used to parse the new rows
+        state_dir(str):directory holding the history and manifest files
+        watermark_column(str):monotonically increasing column used as the high-water mark
+        '''
+        self.ingestor=ingestor
+        self.state_dir=state_dir
+        self.watermark_column=watermark_column
+
+    def _state_paths(self,file_path:str)->tuple:
+        '''returns the history and manifest paths for a source and the wrapped ingestor options'''
+        options=json.dumps(
+            {"source":os.path.abspath(file_path),"ingestor":type(self.ingestor).__name__,
+             "options":vars(self.ingestor),"watermark":self.watermark_column},
+            sort_keys=True,default=str,
+        )
+        key=hashlib.sha256(options.encode()).hexdigest()
+        return (os.path.join(self.state_dir,f"{key}.history.arrow"),
+                os.path.join(self.state_dir,f"{key}.manifest.json"))
+
+    def _load_state(self,file_path:str)->tuple:
+        '''returns the stored history and manifest,or (None,{}) on the first run'''
+        history_path,manifest_path=self._state_paths(file_path)
+        if not (os.path.exists(history_path) and os.path.exists(manifest_path)):
+            return None,{}
+        with open(manifest_path)as f:
+            manifest=json.load(f)
+        return _read_arrow(history_path),manifest
+
+    def _save_state(self,file_path:str,history:pd.DataFrame,manifest:dict):
+        '''persists the merged history and then the manifest that points past it'''
+        history_path,manifest_path=self._state_paths(file_path)
+        _write_arrow(history,history_path)
+        tmp_path=f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path,"w")as f:
+            json.dump(manifest,f,default=str)
+        os.replace(tmp_path,manifest_path)
+
+    def _read_new_zip_rows(self,file_path:str,manifest:dict)->tuple:
+        '''parses the csv member from the recorded byte offset,returns (rows,new manifest)'''
+        with zipfile.ZipFile(file_path,"r")as zip_ref:
+            csv_member=self.ingestor._resolve_member(zip_ref)
+            size=zip_ref.getinfo(csv_member).file_size
+            offset=manifest.get("byte_offset")
+
+            #the member shrank or was never read,so the history cannot be trusted
+            if offset is None or offset>size:
+                with zip_ref.open(csv_member)as csv_file:
+                    df=self.ingestor._read_csv(csv_file)
+                return df,{"byte_offset":size,"columns":list(df.columns),"full":True}
+            if offset==size:
+                return None,manifest
+
+            with zip_ref.open(csv_member)as csv_file:
+                csv_file.seek(offset)
+                df=self.ingestor._read_csv(csv_file,header=None,names=manifest["columns"])
+            return df,dict(manifest,byte_offset=size,full=False)
+
+    def _read_new_columnar_rows(self,file_path:str,manifest:dict)->tuple:
+        '''scans the source with the watermark pushed down as a filter,returns (rows,new manifest)'''
+        watermark=manifest.get("watermark")
+        if watermark is None:
+            return self.ingestor.ingest(file_path),{"full":True}
+
+        predicate=(self.watermark_column,">",watermark)
+        filters=self.ingestor.filters or []
+        if filters and isinstance(filters[0][0],(list,tuple)):
+            filters=[list(group)+[predicate] for group in filters]
+        else:
+            filters=list(filters)+[predicate]
+        ingestor=type(self.ingestor)(columns=self.ingestor.columns,filters=filters,schema=self.ingestor.schema)
+        return ingestor.ingest(file_path),dict(manifest,full=False)
+
+    def ingest(self,file_path:str)->pd.DataFrame:
+        '''returns the full history,parsing only the rows appended since the last run'''
+        history,manifest=self._load_state(file_path)
+
+        if isinstance(self.ingestor,ZipDataIngestor):
+            new_rows,manifest=self._read_new_zip_rows(file_path,manifest)
+        elif isinstance(self.ingestor,ColumnarDataIngestor):
+            new_rows,manifest=self._read_new_columnar_rows(file_path,manifest)
+        else:
+            new_rows,manifest=self.ingestor.ingest(file_path),dict(manifest,full=history is None)
+
+        if new_rows is not None and (manifest.pop("full") or history is None):
+            history=None
+        elif new_rows is not None and self.watermark_column in new_rows.columns and "watermark" in manifest:
+            #guards against rows that were already ingested,e.g. a re-sent tail of the file
+            new_rows=new_rows[new_rows[self.watermark_column]>manifest["watermark"]]
+        if history is not None and (new_rows is None or len(new_rows)==0):
+            logging.info("no new rows since the last incremental ingestion")
+            return history
+
+        logging.info(f"ingested {len(new_rows)} new rows")
+        history=concat_frames([history,new_rows])
+        if self.watermark_column in history.columns and len(history):
+            watermark=history[self.watermark_column].max()
+            manifest["watermark"]=watermark.item() if hasattr(watermark,"item") else watermark
+        self._save_state(file_path,history,manifest)
+        return history
+
     
 #implement a Facotry to create Dataingestors
 class DataIngestorFactory:
     @staticmethod
-    def get_data_ingestor(file_extension:str)-> DataIngestor:
-        '''returns the appropriate DataIngestor bsed on file extension.'''
+    def get_data_ingestor(file_extension:str,**kwargs)-> DataIngestor:
+        '''
+        returns the appropriate DataIngestor bsed on file extension,kwargs are passed to the ingestor.
+
+        an empty extension selects the ingestor for a partitioned parquet directory
+        '''
         if file_extension==".zip":
-            return ZipDataIngestor()
+            return ZipDataIngestor(**kwargs)
+        elif file_extension==".parquet":
+            return ParquetDataIngestor(**kwargs)
+        elif file_extension in (".feather",".arrow"):
+            return FeatherDataIngestor(**kwargs)
+        elif file_extension=="":
+            return PartitionedParquetDataIngestor(**kwargs)
         else:
             raise ValueError(f"No ingestor available for file extension: {file_extension}")
 
@@ -3,8 +3,9 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 import pandas as pd
-from sklearn.base import RegressorMixin
+from sklearn.base import RegressorMixin, clone
 from sklearn.metrics import mean_squared_error, r2_score
+from src.data_splitter import run_folds
 
 # Setup logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -96,6 +97,115 @@ class ModelEvaluator:
         return self._strategy.evaluate_model(model, X_test, y_test)
 
 
+def _pack_frame(X: pd.DataFrame):
+    """
+    Packs a frame into one float block that can be shared between fold workers.
+
+    Numeric columns are stored as they are, every other column as its factorized codes with NaN
+    for missing values. The codes only name the values, so packing fits nothing on the data.
+
+    Parameters:
+    X (pd.DataFrame): The raw feature frame.
+
+    Returns:
+    tuple: The (rows, columns) float block and the layout _unpack_frame rebuilds the frame from.
+    """
+    block = np.empty((len(X), X.shape[1]))
+    categories = {}
+    sparse_dtypes = {}
+    for j, column in enumerate(X.columns):
+        values = X[column]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            block[:, j] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            if isinstance(values.dtype, pd.SparseDtype):
+                sparse_dtypes[column] = values.dtype
+        else:
+            codes, uniques = pd.factorize(values)
+            block[:, j] = np.where(codes < 0, np.nan, codes)
+            categories[column] = np.asarray(uniques, dtype=object)
+    return block, (list(X.columns), categories, sparse_dtypes)
+
+
+def _unpack_frame(block: np.ndarray, layout: tuple) -> pd.DataFrame:
+    """
+    Rebuilds the rows of a packed frame with their original column names and values.
+
+    Parameters:
+    block (np.ndarray): Rows of the block returned by _pack_frame.
+    layout (tuple): The layout returned by _pack_frame.
+
+    Returns:
+    pd.DataFrame: The rows with categorical values and sparse columns restored.
+    """
+    columns, categories, sparse_dtypes = layout
+    frame = pd.DataFrame(block, columns=columns)
+    for column, uniques in categories.items():
+        codes = frame[column].to_numpy()
+        # code -1 indexes the appended NaN, the missing value marker of the imputers
+        codes = np.where(np.isnan(codes), -1, codes).astype(np.intp)
+        frame[column] = np.append(uniques, np.nan)[codes]
+    for column, dtype in sparse_dtypes.items():
+        frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+def _fit_and_evaluate_fold(
+    X, y, train_indices, test_indices, model: RegressorMixin, layout: tuple = None
+) -> dict:
+    """
+    Fits a fresh copy of the model on the training rows of one fold and evaluates it on its test rows.
+
+    Parameters:
+    X (np.ndarray or scipy.sparse matrix): The feature matrix, shared between folds.
+    y (np.ndarray): The target, shared between folds.
+    train_indices (np.ndarray): The training row positions.
+    test_indices (np.ndarray): The testing row positions.
+    model (RegressorMixin): The unfitted model or pipeline to clone.
+    layout (tuple): The layout of a packed frame, the fold rows are then unpacked before fitting.
+
+    Returns:
+    dict: The evaluation metrics of the fold.
+    """
+    X_train, X_test = X[train_indices], X[test_indices]
+    if layout is not None:
+        X_train, X_test = _unpack_frame(X_train, layout), _unpack_frame(X_test, layout)
+    fold_model = clone(model).fit(X_train, y[train_indices])
+    y_pred = fold_model.predict(X_test)
+    y_test = y[test_indices]
+    return {"Mean Squared Error": mean_squared_error(y_test, y_pred), "R-Squared": r2_score(y_test, y_pred)}
+
+
+def cross_validate(model: RegressorMixin, X, y, folds: list, n_jobs: int = None) -> dict:
+    """
+    Cross-validates a model with its folds running in parallel over one shared copy of the data.
+
+    Given a raw frame and a whole pipeline, the frame is packed into one shared numeric block and
+    every fold refits the preprocessing on its own training rows, so no test row reaches a fit.
+
+    Parameters:
+    model (RegressorMixin): The model or pipeline to fit on every fold, it is cloned so it stays unfitted.
+    X (pd.DataFrame, np.ndarray or scipy.sparse matrix): The raw feature frame or a numeric matrix.
+    y (array-like): The target.
+    folds (list): (train_indices, test_indices) pairs, e.g. from DataSplitter.split_indices.
+    n_jobs (int): Number of worker processes, None uses every core and 1 runs in process.
+
+    Returns:
+    dict: The per fold metrics and their mean.
+    """
+    logging.info(f"Cross-validating the model on {len(folds)} folds.")
+    layout = None
+    if isinstance(X, pd.DataFrame):
+        X, layout = _pack_frame(X)
+    fold_metrics = run_folds(
+        _fit_and_evaluate_fold, X, y, folds, n_jobs=n_jobs, model=model, layout=layout
+    )
+    metrics = {
+        name: float(np.mean([fold[name] for fold in fold_metrics])) for name in fold_metrics[0]
+    }
+    logging.info(f"Cross-validation Metrics: {metrics}")
+    return {"folds": fold_metrics, "mean": metrics}
+
+
 # Example usage
 if __name__ == "__main__":
     # Example trained model and data (replace with actual trained model and data)
@@ -1,10 +1,16 @@
 import logging
 from abc import ABC,abstractmethod
+from functools import partial
+from typing import Iterable,Iterator
 
+import joblib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from scipy.stats import chi2
+from sklearn.covariance import MinCovDet
+from src.streaming_statistics import FrameStatistics,compute_statistics,tracked_columns
 
 #setup logging configuration
 logging.basicConfig(level=logging.INFO,format="%(asctime)s - %(levelname)s - %(message)s")
@@ -24,6 +30,55 @@ class OutlierDetectionStrategy(ABC):
         '''
         pass
 
+    def row_mask(self,df:pd.DataFrame)->np.ndarray:
+        '''
+        returns the rows to keep,i.e. rows without an outlier in any column
+
+        strategies override this with a kernel that folds every column into one boolean vector
+        instead of building a boolean frame
+
+        parameters:
+        df(pd.DataFrame):the dataframe containing features for outlier detection
+
+        returns:
+        np.ndarray:a boolean vector,True for rows without outliers
+        '''
+        return ~self.detect_outliers(df).to_numpy().any(axis=1)
+
+    def fit(self,df:pd.DataFrame):
+        '''learns the parameters of the detector,strategies that estimate them per call learn nothing'''
+        return self
+
+    def save(self,path:str):
+        '''persists the strategy,including any fitted parameters'''
+        joblib.dump(self,path)
+
+    @staticmethod
+    def load(path:str)->"OutlierDetectionStrategy":
+        '''loads a strategy persisted with save'''
+        return joblib.load(path)
+
+
+def _fold_columns(df:pd.DataFrame,flag_outliers)->np.ndarray:
+    '''
+    folds the per column outlier verdicts into one row-keep vector
+
+    parameters:
+    df(pd.DataFrame):the numeric dataframe
+    flag_outliers(Callable):called with a column position,its float64 values and a scratch
+                            boolean vector,it writes True into the vector for outlier rows
+
+    returns:
+    np.ndarray:a boolean vector,True for rows without outliers
+    '''
+    keep=np.ones(len(df),dtype=bool)
+    flags=np.empty(len(df),dtype=bool)
+    for position in range(df.shape[1]):
+        values=df.iloc[:,position].to_numpy(dtype=np.float64,na_value=np.nan)
+        flag_outliers(position,values,flags)
+        keep&=~flags
+    return keep
+
     #concrete strategy for Z-Score based outlier detection
 class ZScoreOutlierDetection(OutlierDetectionStrategy):
         def __init__(self, threshold=3):
@@ -35,6 +90,25 @@ class ZScoreOutlierDetection(OutlierDetectionStrategy):
             outliers=z_scores>self.threshold
             logging.info(f"Outliers detected with z-score threshold:{self.threshold}")
             return outliers
+
+        def row_mask(self,df:pd.DataFrame)->np.ndarray:
+            '''keeps rows whose every |value-mean| is within threshold standard deviations'''
+            #per column statistics,a frame wide df.std() would allocate a copy of the frame
+            means=np.array([df.iloc[:,position].mean() for position in range(df.shape[1])],dtype=np.float64)
+            stds=np.array([df.iloc[:,position].std() for position in range(df.shape[1])],dtype=np.float64)
+            return self._mask(df,means,stds)
+
+        def _mask(self,df:pd.DataFrame,means:np.ndarray,stds:np.ndarray)->np.ndarray:
+            '''folds the z-score verdicts of every column of df under the given statistics'''
+            limits=stds*self.threshold
+            scratch=np.empty(len(df))
+
+            def flag_outliers(position,values,flags):
+                np.subtract(values,means[position],out=scratch)
+                np.abs(scratch,out=scratch)
+                np.greater(scratch,limits[position],out=flags)
+
+            return _fold_columns(df,flag_outliers)
         
     #concrete strategy for IQR bsed outlier detection
 class IQROutlierDetection(OutlierDetectionStrategy):
@@ -46,7 +120,221 @@ class IQROutlierDetection(OutlierDetectionStrategy):
             outliers=(df<(Q1-1.5*IQR))|(df>(Q3+1.5*IQR))
             logging.info("Outliers detected using the IQR method")
             return outliers
+
+        def row_mask(self,df:pd.DataFrame)->np.ndarray:
+            '''keeps rows whose every value lies within 1.5 IQR of the quartiles'''
+            Q1,Q3=df.quantile([0.25,0.75]).to_numpy(dtype=np.float64)
+            return self._mask(df,Q1,Q3)
+
+        def _mask(self,df:pd.DataFrame,Q1:np.ndarray,Q3:np.ndarray)->np.ndarray:
+            '''folds the IQR verdicts of every column of df under the given quartiles'''
+            IQR=Q3-Q1
+            lower=Q1-1.5*IQR
+            upper=Q3+1.5*IQR
+            above=np.empty(len(df),dtype=bool)
+
+            def flag_outliers(position,values,flags):
+                np.less(values,lower[position],out=flags)
+                np.greater(values,upper[position],out=above)
+                flags|=above
+
+            return _fold_columns(df,flag_outliers)
         
+def _project(chunks:Iterable[pd.DataFrame],columns:list)->Iterator[pd.DataFrame]:
+    '''
+    yields the given columns of every chunk
+
+    when columns is None they are the numeric columns of the first chunk that hold a value,an all
+    missing column parses as float in one chunk and as text in the next,so every chunk is projected
+    onto the same columns
+    '''
+    for chunk in chunks:
+        if columns is None:
+            columns=tracked_columns(chunk,"mean")
+        yield chunk[columns]
+
+
+#streaming strategy for Z-Score based outlier detection
+#--------------------------------------------------------
+#fit_chunks takes one statistics pass over chunked input with mergeable Welford moments,
+#the row mask then tests every chunk against those global statistics
+class StreamingZScoreOutlierDetection(ZScoreOutlierDetection):
+        def __init__(self,threshold=3):
+            '''
+            parameters:
+            threshold(float):number of standard deviations from the mean beyond which a value is an outlier
+            '''
+            super().__init__(threshold)
+            self.columns_=None
+            self.means_=None
+            self.stds_=None
+
+        def fit_chunks(self,chunks:Iterable[pd.DataFrame],columns:list=None,n_jobs:int=1):
+            '''
+            learns the mean and standard deviation of every numeric column in one pass
+
+            parameters:
+            chunks(Iterable[pd.DataFrame]):the chunks,e.g. from DataIngestor.ingest_chunks
+            columns(list):the columns to test,defaults to the numeric columns of the first chunk
+            n_jobs(int):number of worker processes,None uses every core and 1 runs in process
+
+            returns:
+            StreamingZScoreOutlierDetection:the fitted strategy
+            '''
+            statistics=compute_statistics(_project(chunks,columns),partial(FrameStatistics,"mean"),n_jobs)
+            self.columns_=statistics.columns or []
+            if statistics.moments is None:
+                self.means_=self.stds_=np.empty(0)
+            else:
+                self.means_=statistics.moments.means()
+                self.stds_=statistics.moments.std(ddof=1)
+            return self
+
+        def detect_outliers(self,df:pd.DataFrame)->pd.DataFrame:
+            if self.columns_ is None:
+                raise ValueError("StreamingZScoreOutlierDetection must be fitted before detecting outliers.")
+            logging.info("Detecting outliers using the streaming Z-Score method")
+            z_scores=np.abs((df[self.columns_]-self.means_)/self.stds_)
+            return z_scores>self.threshold
+
+        def row_mask(self,df:pd.DataFrame)->np.ndarray:
+            '''keeps rows whose every fitted column lies within threshold standard deviations'''
+            if self.columns_ is None:
+                raise ValueError("StreamingZScoreOutlierDetection must be fitted before detecting outliers.")
+            return self._mask(df[self.columns_],self.means_,self.stds_)
+
+
+#streaming strategy for IQR based outlier detection
+#----------------------------------------------------
+#fit_chunks estimates the quartiles of every column with mergeable KLL sketches,so memory stays
+#bounded by the sketch size instead of growing with the number of rows
+class StreamingIQROutlierDetection(IQROutlierDetection):
+        def __init__(self,k:int=200):
+            '''
+            parameters:
+            k(int):the sketch size,larger values give more accurate quartiles
+            '''
+            self.k=k
+            self.columns_=None
+            self.q1_=None
+            self.q3_=None
+
+        def fit_chunks(self,chunks:Iterable[pd.DataFrame],columns:list=None,n_jobs:int=1):
+            '''
+            estimates the quartiles of every numeric column in one pass
+
+            parameters:
+            chunks(Iterable[pd.DataFrame]):the chunks,e.g. from DataIngestor.ingest_chunks
+            columns(list):the columns to test,defaults to the numeric columns of the first chunk
+            n_jobs(int):number of worker processes,None uses every core and 1 runs in process
+
+            returns:
+            StreamingIQROutlierDetection:the fitted strategy
+            '''
+            statistics=compute_statistics(
+                _project(chunks,columns),partial(FrameStatistics,"median",self.k),n_jobs
+            )
+            self.columns_=statistics.columns or []
+            sketches=statistics.sketches or {}
+            self.q1_=np.array([sketches[column].quantile(0.25) for column in self.columns_],dtype=np.float64)
+            self.q3_=np.array([sketches[column].quantile(0.75) for column in self.columns_],dtype=np.float64)
+            return self
+
+        def detect_outliers(self,df:pd.DataFrame)->pd.DataFrame:
+            if self.columns_ is None:
+                raise ValueError("StreamingIQROutlierDetection must be fitted before detecting outliers.")
+            logging.info("Detecting outliers using the streaming IQR method")
+            IQR=self.q3_-self.q1_
+            values=df[self.columns_]
+            return (values<(self.q1_-1.5*IQR))|(values>(self.q3_+1.5*IQR))
+
+        def row_mask(self,df:pd.DataFrame)->np.ndarray:
+            '''keeps rows whose every fitted column lies within 1.5 IQR of the estimated quartiles'''
+            if self.columns_ is None:
+                raise ValueError("StreamingIQROutlierDetection must be fitted before detecting outliers.")
+            return self._mask(df[self.columns_],self.q1_,self.q3_)
+
+#multivariate strategy based on the robust Mahalanobis distance
+#----------------------------------------------------------------
+#fit estimates a robust location and covariance with the minimum covariance determinant,so the
+#outliers themselves do not inflate the covariance.a row is an outlier when its squared distance
+#exceeds the chi-squared quantile,scoring is a blocked matrix product that needs no pandas,so a
+#fitted detector can flag single requests at serving time
+class RobustMahalanobisOutlierDetection(OutlierDetectionStrategy):
+        def __init__(self,quantile=0.975,support_fraction=None,batch_size=65536,random_state=42):
+            '''
+            parameters:
+            quantile(float):chi-squared quantile of the squared distance above which a row is an outlier
+            support_fraction(float):share of rows the robust estimate is computed on,None lets MinCovDet choose
+            batch_size(int):number of rows scored per block
+            random_state(int):seed of MinCovDet
+            '''
+            self.quantile=quantile
+            self.support_fraction=support_fraction
+            self.batch_size=batch_size
+            self.random_state=random_state
+            self.columns_=None
+            self.location_=None
+            self.precision_=None
+            self.threshold_=None
+
+        def fit(self,df:pd.DataFrame):
+            '''
+            estimates the robust location and precision of the numeric columns on the complete rows
+
+            parameters:
+            df(pd.DataFrame):the training dataframe
+
+            returns:
+            RobustMahalanobisOutlierDetection:the fitted strategy
+            '''
+            numeric=df.select_dtypes(include="number")
+            self.columns_=numeric.columns.tolist()
+            values=numeric.to_numpy(dtype=np.float64,na_value=np.nan)
+            values=values[~np.isnan(values).any(axis=1)]
+            logging.info(f"Fitting robust covariance on {len(values)} complete rows of {len(self.columns_)} columns")
+            estimator=MinCovDet(support_fraction=self.support_fraction,random_state=self.random_state).fit(values)
+            self.location_=estimator.location_
+            self.precision_=estimator.get_precision()
+            self.threshold_=float(chi2.ppf(self.quantile,df=len(self.columns_)))
+            return self
+
+        def score_array(self,values:np.ndarray)->np.ndarray:
+            '''
+            returns the squared robust Mahalanobis distance of every row
+
+            parameters:
+            values(np.ndarray):a (rows,columns) array in the order of columns_,a missing value
+                               counts as the location and adds nothing to the distance
+
+            returns:
+            np.ndarray:one squared distance per row
+            '''
+            if self.location_ is None:
+                raise ValueError("RobustMahalanobisOutlierDetection must be fitted before scoring.")
+            values=np.atleast_2d(np.asarray(values,dtype=np.float64))
+            distances=np.empty(len(values))
+            for start in range(0,len(values),self.batch_size):
+                block=values[start:start+self.batch_size]-self.location_
+                np.nan_to_num(block,copy=False,nan=0.0)
+                distances[start:start+len(block)]=np.einsum("ij,ij->i",block@self.precision_,block)
+            return distances
+
+        def score(self,df:pd.DataFrame)->np.ndarray:
+            '''returns the squared robust Mahalanobis distance of every row of the dataframe'''
+            if self.columns_ is None:
+                raise ValueError("RobustMahalanobisOutlierDetection must be fitted before scoring.")
+            return self.score_array(df[self.columns_].to_numpy(dtype=np.float64,na_value=np.nan))
+
+        def detect_outliers(self,df:pd.DataFrame)->pd.DataFrame:
+            '''returns a one column boolean dataframe,the verdict is multivariate so there is none per column'''
+            logging.info("Detecting outliers using the robust Mahalanobis distance")
+            return pd.DataFrame({"mahalanobis_outlier":self.score(df)>self.threshold_},index=df.index)
+
+        def row_mask(self,df:pd.DataFrame)->np.ndarray:
+            '''keeps rows whose squared distance is within the chi-squared threshold'''
+            return self.score(df)<=self.threshold_
+
 #context class for Outlier Detection and Handling
 class OutlierDetector:
     def __init__(self,strategy:OutlierDetectionStrategy):
@@ -60,20 +348,68 @@ class OutlierDetector:
         logging.info("executing outlier detection strategy")
         return self._strategy.detect_outliers(df)
 
-    def handle_outliers(self,df:pd.DataFrame,method="remove",**kwargs)->pd.DataFrame:
-        outliers=self.detect_outliers(df)
+    def row_mask(self,df:pd.DataFrame)->np.ndarray:
+        logging.info("computing the rows without outliers")
+        return self._strategy.row_mask(df)
+
+    def fit(self,df:pd.DataFrame):
+        logging.info("fitting outlier detection strategy")
+        self._strategy.fit(df)
+        return self
+
+    def handle_outliers(self,df:pd.DataFrame,method="remove",columns:list=None,**kwargs)->pd.DataFrame:
+        '''
+        removes or caps outliers,testing only the given columns but keeping every column of the frame
+
+        parameters:
+        df(pd.DataFrame):the dataframe,non-numeric columns are carried through untouched
+        method(str):'remove' drops rows with an outlier in a tested column,'cap' clips the tested columns
+        columns(list):the columns to test,defaults to every numeric column
+
+        returns:
+        pd.DataFrame:the cleaned dataframe
+        '''
+        if columns is None:
+            columns=df.select_dtypes(include="number").columns.tolist()
         if method=="remove":
             logging.info("removing outliers from the dataset")
-            df_cleaned=df[(~outliers).all(axis=1)]
+            #the mask is computed on the tested columns and applied to the whole frame in one take
+            df_cleaned=df.take(np.flatnonzero(self.row_mask(df[columns])))
         elif method=="cap":
             logging.info("capping outliers in the dataset")
-            df_cleaned=df.clip(lower=df.quantile(0.01),upper=df.quantile(0.99),axis=1)
+            #both bounds from one quantile call,i.e. one sort per column
+            bounds=df[columns].quantile([0.01,0.99])
+            df_cleaned=df.copy()
+            df_cleaned[columns]=df[columns].clip(lower=bounds.loc[0.01],upper=bounds.loc[0.99],axis=1)
         else:
             logging.warning(f"unknown method'{method}'.No oulier handling performed")
             return df
         logging.info("outlier handling ocmpleted")
         return df_cleaned
 
+    def fit_chunks(self,chunks:Iterable[pd.DataFrame],columns:list=None,n_jobs:int=1):
+        '''
+        runs the statistics pass of a streaming strategy over chunked input
+
+        parameters:
+        chunks(Iterable[pd.DataFrame]):the chunks,e.g. from DataIngestor.ingest_chunks
+        columns(list):the columns to test,defaults to every numeric column
+        n_jobs(int):number of worker processes,None uses every core and 1 runs in process
+        '''
+        logging.info("fitting outlier statistics over chunks")
+        self._strategy.fit_chunks(chunks,columns=columns,n_jobs=n_jobs)
+        return self
+
+    def filter_chunks(self,chunks:Iterable[pd.DataFrame])->Iterator[pd.DataFrame]:
+        '''
+        the filtering pass,yields every chunk without the rows that hold an outlier
+
+        the chunks must be a fresh iterator over the same data as the one given to fit_chunks,
+        every column of a chunk is kept
+        '''
+        for chunk in chunks:
+            yield chunk.take(np.flatnonzero(self._strategy.row_mask(chunk)))
+
     def visualize_outliers(self,df:pd.DataFrame,features:list):
         logging.info(f"visualizing outlires for features:{features}")
         for feature in features:
@@ -0,0 +1,395 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+#setup logging configuration
+logging.basicConfig(level=logging.INFO,format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+#mergeable running mean and variance
+#-----------------------------------
+#Welford's update applied per chunk and Chan's parallel formula to combine partial results,
+#one instance tracks a vector of columns and ignores missing values
+class RunningMoments:
+    def __init__(self,n_columns:int=0):
+        '''
+        Initializes empty running moments
+
+        parameters:
+        n_columns(int):the number of columns tracked
+        '''
+        self._reset(n_columns)
+
+    def _reset(self,n_columns:int):
+        '''sets empty moments for n_columns columns'''
+        self.count=np.zeros(n_columns)
+        self.mean=np.zeros(n_columns)
+        self.m2=np.zeros(n_columns)
+
+    def _combine(self,count:np.ndarray,mean:np.ndarray,m2:np.ndarray):
+        '''folds the moments of another partition into this one'''
+        total=self.count+count
+        with np.errstate(invalid="ignore",divide="ignore"):
+            delta=mean-self.mean
+            weight=np.where(total>0,count/total,0.0)
+            self.mean=self.mean+delta*weight
+            self.m2=self.m2+m2+delta**2*self.count*weight
+        self.count=total
+
+    def update(self,values):
+        '''
+        adds a chunk of rows to the moments
+
+        parameters:
+        values(np.ndarray):a 2-D array of shape (rows,columns),missing values are NaN
+
+        returns:
+        RunningMoments:the updated moments
+        '''
+        values=np.asarray(values,dtype=np.float64)
+        if values.ndim==1:
+            values=values[:,None]
+        if len(self.count)==0:
+            self._reset(values.shape[1])
+        present=~np.isnan(values)
+        count=present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore",divide="ignore"):
+            mean=np.where(count>0,np.nansum(values,axis=0)/count,0.0)
+        m2=np.nansum((values-mean)**2,axis=0)
+        self._combine(count,mean,m2)
+        return self
+
+    def extend(self,n_columns:int):
+        '''appends n_columns empty columns'''
+        empty=np.zeros(n_columns)
+        self.count=np.concatenate([self.count,empty])
+        self.mean=np.concatenate([self.mean,empty])
+        self.m2=np.concatenate([self.m2,empty])
+        return self
+
+    def merge(self,other:"RunningMoments",positions=None):
+        '''
+        merges the moments computed on another partition,e.g. by another worker process
+
+        parameters:
+        other(RunningMoments):the moments of the other partition
+        positions(list):optional column of these moments every column of other is merged into,
+                        by default the columns line up one to one
+        '''
+        if positions is None:
+            if len(self.count)==0:
+                self._reset(len(other.count))
+            if len(other.count):
+                self._combine(other.count,other.mean,other.m2)
+            return self
+        #columns other does not track are merged with empty moments,which leaves them unchanged
+        count,mean,m2=np.zeros(len(self.count)),np.zeros(len(self.count)),np.zeros(len(self.count))
+        count[positions],mean[positions],m2[positions]=other.count,other.mean,other.m2
+        self._combine(count,mean,m2)
+        return self
+
+    def variance(self,ddof:int=1)->np.ndarray:
+        '''returns the per column variance,NaN where there are not enough values'''
+        with np.errstate(invalid="ignore",divide="ignore"):
+            return np.where(self.count>ddof,self.m2/(self.count-ddof),np.nan)
+
+    def std(self,ddof:int=1)->np.ndarray:
+        '''returns the per column standard deviation'''
+        return np.sqrt(self.variance(ddof))
+
+    def means(self)->np.ndarray:
+        '''returns the per column mean,NaN for columns without values'''
+        return np.where(self.count>0,self.mean,np.nan)
+
+
+#mergeable approximate quantile sketch
+#------------------------------------
+#a KLL sketch:values enter level 0 and every full level is sorted and compacted by keeping
+#every other item,which moves half of them to the next level with twice the weight.
+#memory stays O(k log(n/k)) and the rank error is roughly O(1/k)
+class QuantileSketch:
+    def __init__(self,k:int=200,seed:int=None):
+        '''
+        Initializes an empty sketch
+
+        parameters:
+        k(int):capacity of the top level,larger values give more accurate quantiles
+        seed(int):seed of the generator choosing which half of a level is kept
+        '''
+        self.k=k
+        self.count=0
+        self.levels=[np.empty(0)]
+        self._rng=np.random.default_rng(seed)
+
+    def _capacity(self,level:int)->int:
+        '''returns the capacity of a level,lower levels shrink geometrically'''
+        depth=len(self.levels)-1-level
+        return max(int(np.ceil(self.k*(2/3)**depth)),2)
+
+    def _compress(self):
+        '''compacts levels until every level fits its capacity'''
+        level=0
+        while level<len(self.levels):
+            items=self.levels[level]
+            if len(items)<=self._capacity(level):
+                level+=1
+                continue
+            if level+1==len(self.levels):
+                self.levels.append(np.empty(0))
+            items=np.sort(items)
+            #an odd item out stays behind so no weight is lost
+            keep=items[-1:] if len(items)%2 else items[:0]
+            items=items[:len(items)-len(keep)]
+            promoted=items[self._rng.integers(2)::2]
+            self.levels[level+1]=np.concatenate([self.levels[level+1],promoted])
+            self.levels[level]=keep
+            #adding a level shrinks the capacity of the levels below,so start again
+            level=0
+
+    def update(self,values):
+        '''
+        adds values to the sketch,missing values are ignored
+
+        parameters:
+        values(np.ndarray):the values to add
+
+        returns:
+        QuantileSketch:the updated sketch
+        '''
+        values=np.asarray(values,dtype=np.float64).ravel()
+        values=values[~np.isnan(values)]
+        self.count+=len(values)
+        self.levels[0]=np.concatenate([self.levels[0],values])
+        self._compress()
+        return self
+
+    def merge(self,other:"QuantileSketch"):
+        '''merges a sketch built on another partition into this one'''
+        while len(self.levels)<len(other.levels):
+            self.levels.append(np.empty(0))
+        for level,items in enumerate(other.levels):
+            self.levels[level]=np.concatenate([self.levels[level],items])
+        self.count+=other.count
+        self._compress()
+        return self
+
+    def quantile(self,q:float)->float:
+        '''returns the approximate q-quantile,NaN for an empty sketch'''
+        if self.count==0:
+            return np.nan
+        items=np.concatenate(self.levels)
+        weights=np.concatenate([np.full(len(level_items),2.0**level) for level,level_items in enumerate(self.levels)])
+        order=np.argsort(items,kind="stable")
+        cumulative=np.cumsum(weights[order])
+        index=np.searchsorted(cumulative,q*cumulative[-1],side="left")
+        return float(items[order][min(index,len(items)-1)])
+
+
+#mergeable bounded heavy hitters counter
+#--------------------------------------
+#the Misra-Gries summary keeps at most `capacity` counters,any value that occurs in more than
+#n/(capacity+1) rows is guaranteed to survive,so the most common value is exact for a clear mode
+class HeavyHitters:
+    def __init__(self,capacity:int=100):
+        '''
+        Initializes an empty counter
+
+        parameters:
+        capacity(int):the maximum number of values tracked
+        '''
+        self.capacity=capacity
+        self.counts=pd.Series(dtype=np.float64)
+
+    def _combine(self,counts:pd.Series):
+        '''adds counts and decrements every counter if there are too many'''
+        merged=self.counts.add(counts,fill_value=0) if len(self.counts) else counts.astype(np.float64)
+        if len(merged)>self.capacity:
+            threshold=merged.nlargest(self.capacity+1).iloc[-1]
+            merged=merged[merged>threshold]-threshold
+        self.counts=merged
+
+    def update(self,values):
+        '''
+        adds values to the counter,missing values are ignored
+
+        parameters:
+        values(pd.Series):the values to add
+
+        returns:
+        HeavyHitters:the updated counter
+        '''
+        counts=pd.Series(values).value_counts(dropna=True)
+        counts=counts[counts>0]
+        #category and typed indexes would not align across chunks with different categories
+        counts.index=counts.index.astype(object)
+        self._combine(counts)
+        return self
+
+    def merge(self,other:"HeavyHitters"):
+        '''merges a counter built on another partition into this one'''
+        if len(other.counts):
+            self._combine(other.counts)
+        return self
+
+    def most_common(self):
+        '''returns the most frequent value,None when nothing was counted'''
+        if len(self.counts)==0:
+            return None
+        return self.counts.idxmax()
+
+
+def tracked_columns(df:pd.DataFrame,method:str)->list:
+    '''
+    returns the columns a FrameStatistics for the method tracks,picked from one chunk
+
+    mode tracks every column,mean and median the numeric columns that hold a value.an all missing
+    column parses as float in one chunk and as text in the next,so the columns are settled once
+    from the first chunk and handed to the statistics of every chunk
+    '''
+    if method=="mode":
+        return list(df.columns)
+    numeric=df.select_dtypes(include="number")
+    return numeric.columns[numeric.notna().any().to_numpy()].tolist()
+
+
+#per column statistics of a dataframe for one fill method
+#--------------------------------------------------------
+#mean uses RunningMoments,median a QuantileSketch per column and mode a HeavyHitters per
+#column,the columns are given or taken from the first chunk
+class FrameStatistics:
+    def __init__(self,method:str="mean",k:int=200,capacity:int=100,columns:list=None):
+        '''
+        Initializes empty statistics
+
+        parameters:
+        method(str):the statistic to track('mean','median','mode')
+        k(int):the sketch size used for the median
+        capacity(int):the number of counters used for the mode
+        columns(list):the tracked columns,by default tracked_columns of the first chunk
+        '''
+        if method not in ("mean","median","mode"):
+            raise ValueError(f"Unsupported streaming statistic:{method}")
+        self.method=method
+        self.k=k
+        self.capacity=capacity
+        self.columns=None
+        self.moments=None
+        self.sketches=None
+        if columns is not None:
+            self._track(list(columns))
+
+    def _track(self,columns:list):
+        '''sets empty statistics for the columns'''
+        self.columns=columns
+        if self.method=="mean":
+            self.moments=RunningMoments(len(columns))
+        elif self.method=="median":
+            self.sketches={column:QuantileSketch(self.k) for column in columns}
+        else:
+            self.sketches={column:HeavyHitters(self.capacity) for column in columns}
+
+    def _init_columns(self,df:pd.DataFrame):
+        '''picks the tracked columns from the first chunk'''
+        self._track(tracked_columns(df,self.method))
+
+    def update(self,df:pd.DataFrame):
+        '''
+        adds a chunk of rows to the statistics
+
+        parameters:
+        df(pd.DataFrame):the chunk
+
+        returns:
+        FrameStatistics:the updated statistics
+        '''
+        if self.columns is None:
+            self._init_columns(df)
+        if self.method=="mean":
+            self.moments.update(df[self.columns].to_numpy(dtype=np.float64,na_value=np.nan))
+        elif self.method=="median":
+            for column in self.columns:
+                self.sketches[column].update(df[column].to_numpy(dtype=np.float64,na_value=np.nan))
+        else:
+            for column in self.columns:
+                self.sketches[column].update(df[column])
+        return self
+
+    def merge(self,other:"FrameStatistics"):
+        '''merges statistics computed on another partition into these'''
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.columns=other.columns
+            self.moments=other.moments
+            self.sketches=other.sketches
+            return self
+        #partitions may track different columns,so they are lined up by name
+        known=set(self.columns)
+        added=[column for column in other.columns if column not in known]
+        self.columns=self.columns+added
+        if self.method=="mean":
+            position={column:j for j,column in enumerate(self.columns)}
+            self.moments.extend(len(added))
+            self.moments.merge(other.moments,[position[column] for column in other.columns])
+        else:
+            for column in other.columns:
+                if column in self.sketches:
+                    self.sketches[column].merge(other.sketches[column])
+                else:
+                    self.sketches[column]=other.sketches[column]
+        return self
+
+    def fill_values(self)->dict:
+        '''returns a mapping of column name to the tracked statistic,columns without values are left out'''
+        if self.columns is None:
+            return {}
+        if self.method=="mean":
+            values=dict(zip(self.columns,self.moments.means()))
+        elif self.method=="median":
+            values={column:sketch.quantile(0.5) for column,sketch in self.sketches.items()}
+        else:
+            values={column:sketch.most_common() for column,sketch in self.sketches.items()}
+        return {column:value for column,value in values.items() if value is not None and not pd.isna(value)}
+
+
+def _update_statistics(statistics,chunk:pd.DataFrame):
+    '''updates empty statistics with one chunk in a worker process'''
+    return statistics.update(chunk)
+
+
+def compute_statistics(chunks:Iterable[pd.DataFrame],make_statistics:Callable,n_jobs:int=1):
+    '''
+    computes mergeable statistics over a stream of chunks,optionally across worker processes
+
+    every chunk is folded into its own statistics object in a worker and the partial results
+    are merged in the parent,at most 2*n_jobs chunks are in flight so memory stays bounded
+
+    parameters:
+    chunks(Iterable[pd.DataFrame]):the chunks,e.g. from DataIngestor.ingest_chunks
+    make_statistics(Callable):returns an empty statistics object with update and merge methods,
+                              the objects it returns must be picklable when n_jobs>1
+    n_jobs(int):number of worker processes,None uses every core and 1 runs in process
+
+    returns:
+    the merged statistics
+    '''
+    result=make_statistics()
+    n_jobs=n_jobs or os.cpu_count() or 1
+    if n_jobs==1:
+        for chunk in chunks:
+            result.update(chunk)
+        return result
+
+    with ProcessPoolExecutor(max_workers=n_jobs)as executor:
+        pending=[]
+        for chunk in chunks:
+            pending.append(executor.submit(_update_statistics,make_statistics(),chunk))
+            if len(pending)>=2*n_jobs:
+                result.merge(pending.pop(0).result())
+        for future in pending:
+            result.merge(future.result())
+    return result
@@ -1,21 +1,86 @@
+import glob
+import os
+from typing import Optional
+
 import pandas as pd
-from src.ingest_data import DataIngestorFactory
+from src.ingest_data import (
+    CachedDataIngestor,
+    DataIngestorFactory,
+    IncrementalDataIngestor,
+    MultiSourceDataIngestor,
+    apply_schema,
+    infer_schema,
+    load_schema,
+    save_schema,
+)
 from zenml import step
 
 
 @step
-def data_ingestion_step(file_path:str)->pd.DataFrame:
+def data_ingestion_step(
+    file_path:str,
+    member:Optional[str]=None,
+    cache_dir:Optional[str]=None,
+    cache_max_size_mb:float=1024,
+    schema_path:Optional[str]=None,
+    columns:Optional[list]=None,
+    filters:Optional[list]=None,
+    n_jobs:Optional[int]=None,
+    incremental:bool=False,
+    watermark_column:str="Order",
+)->pd.DataFrame:
+
+    '''ingest data from a ZIP,Parquet or Feather file or a partitioned Parquet directory
+
+    a glob pattern in file_path or member,e.g. "data/*.zip",ingests every matching source in
+    parallel into one frame with a "source" column
 
-    '''ingest data from a ZIP file using the appropriate DataIngestor'''
+    member(str):optional name or glob pattern of the csv file inside a ZIP archive
+    cache_dir(str):optional directory of a content-addressed ingestion cache,e.g. ".ingest_cache"
+    cache_max_size_mb(float):size the ingestion cache is trimmed back to,least recently used first
+    schema_path(str):optional json schema of compact dtypes,inferred and persisted on first use
+    columns(list):columns to read from columnar sources
+    filters(list):row filter pushed down into columnar sources,e.g. [["Yr Sold",">=",2008]]
+    n_jobs(int):number of worker processes for multi source ingestion,defaults to the number of cores
+    incremental(bool):only parse rows appended since the last run and merge them with the stored history
+    watermark_column(str):monotonically increasing column used as the high-water mark when incremental
+    '''
 
-    #determine the file extension
+    #determine the file extension,a directory is read as a partitioned parquet dataset
+    file_extension="" if os.path.isdir(file_path) else os.path.splitext(file_path)[1]
 
-    file_extension=".zip"#since we're dealing with ZIP files
+    #load the declared schema so compact dtypes are applied while parsing
+    schema=None
+    if schema_path is not None and os.path.exists(schema_path):
+        schema=load_schema(schema_path)
 
     #get the appropriate DataIngestor
-    data_ingestor=DataIngestorFactory.get_data_ingestor(file_extension)
+    multi_source=glob.has_magic(file_path) or (member is not None and glob.has_magic(member))
+    if file_extension==".zip":
+        options={"member":member}
+    else:
+        options={"columns":columns,"filters":filters}
+    if multi_source:
+        data_ingestor=MultiSourceDataIngestor(n_jobs=n_jobs,schema=schema,**options)
+    else:
+        data_ingestor=DataIngestorFactory.get_data_ingestor(file_extension,schema=schema,**options)
+
+    #reuse the parsed frame when the archive and parse options are unchanged,
+    #columnar sources are already cheap to read and are not cached
+    if incremental and not multi_source:
+        data_ingestor=IncrementalDataIngestor(
+            data_ingestor,state_dir=cache_dir or ".ingest_cache",watermark_column=watermark_column
+        )
+    elif cache_dir is not None and file_extension==".zip" and not multi_source:
+        data_ingestor=CachedDataIngestor(data_ingestor,cache_dir=cache_dir,max_size_mb=cache_max_size_mb)
 
     #ingest the data and load it into a dataframe
     df=data_ingestor.ingest(file_path)
+
+    #infer and persist a schema on the first run so later runs parse straight into it
+    if schema_path is not None and schema is None:
+        schema=infer_schema(df)
+        save_schema(schema,schema_path)
+        df=apply_schema(df,schema)
     return df
-    
+
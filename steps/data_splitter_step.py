@@ -1,13 +1,36 @@
 from typing import Tuple
+import numpy as np
 import pandas as pd
-from src.data_splitter import DataSplitter,SimpleTrainTestSplitStrategy
+from src.data_splitter import DataSplitter,SimpleTrainTestSplitStrategy,TemporalSplitStrategy
 from zenml import step
 
+def _make_splitter(strategy:str)->DataSplitter:
+    '''returns a DataSplitter for the strategy name,'simple' or 'temporal'(by Yr Sold and Mo Sold)'''
+    if strategy=="simple":
+        return DataSplitter(strategy=SimpleTrainTestSplitStrategy())
+    elif strategy=="temporal":
+        return DataSplitter(strategy=TemporalSplitStrategy())
+    raise ValueError(f"Unsupported data splitting strategy: {strategy}")
+
+
 @step
 def data_splitter_step(
-    df:pd.DataFrame,target_column:str
+    df:pd.DataFrame,target_column:str,strategy:str="simple"
 )->Tuple[pd.DataFrame,pd.DataFrame,pd.Series,pd.Series]:
-    '''splits the data into testing and training data '''
-    splitter=DataSplitter(strategy=SimpleTrainTestSplitStrategy())
+    '''splits the data into testing and training data,strategy 'temporal' tests on the latest sales'''
+    splitter=_make_splitter(strategy)
     X_train,X_test,y_train,y_test=splitter.split(df,target_column)
-    return X_train,X_test,y_train,y_test
\ No newline at end of file
+    return X_train,X_test,y_train,y_test
+
+
+@step
+def data_split_indices_step(
+    df:pd.DataFrame,target_column:str,strategy:str="simple"
+)->Tuple[np.ndarray,np.ndarray]:
+    '''splits the row positions into training and testing indices
+
+    the frame is stored once and the *_from_indices steps take their rows with src.data_splitter.take_split
+    '''
+    splitter=_make_splitter(strategy)
+    train_indices,test_indices=splitter.split_indices(df,target_column)
+    return train_indices,test_indices
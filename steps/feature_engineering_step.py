@@ -1,35 +1,86 @@
+from typing import Optional
+
 import pandas as pd
 from src.feature_engineering import(
     FeatureEngineer,
+    FeaturePipeline,
+    HashingEncoding,
+    HouseAge,
     LogTransformation,
+    MemoizedFeatureEngineeringStrategy,
     MinMaxScaling,
     OneHotEncoding,
     StandardScaling,
+    TotalBathrooms,
+    TotalSquareFootage,
+    YearsSinceRemodel,
+    save_strategy,
 )
 from zenml import step
 
+#derived features default to the AmesHousing input columns when no features are given,features
+#learned from the target run after the split in target_feature_engineering_step
+DERIVED_FEATURES={
+    "total_square_footage":TotalSquareFootage,
+    "house_age":HouseAge,
+    "years_since_remodel":YearsSinceRemodel,
+    "total_bathrooms":TotalBathrooms,
+}
+
+
+def _make_strategy(strategy:str,features:list,sparse:bool=False):
+    '''returns the FeatureEngineeringStrategy registered under the given name'''
+    if strategy=="log":
+        return LogTransformation(features)
+    elif strategy == "standard_scaling":
+        return StandardScaling(features)
+    elif strategy == "minmax_scaling":
+        return MinMaxScaling(features)
+    elif strategy == "onehot_encoding":
+        return OneHotEncoding(features,sparse=sparse)
+    elif strategy == "hashing_encoding":
+        return HashingEncoding(features)
+    elif strategy in DERIVED_FEATURES:
+        return DERIVED_FEATURES[strategy](features) if features else DERIVED_FEATURES[strategy]()
+    else:
+        raise ValueError(f"Unsupported feature engineering strategy: {strategy}")
+
+
 @step
 def feature_engineering_step(
     df:pd.DataFrame,strategy:str="log",
-    features=list
+    features:Optional[list]=None,
+    steps:Optional[list]=None,
+    state_path:Optional[str]=None,
+    sparse:bool=False,
+    cache_dir:Optional[str]=None,
 )->pd.DataFrame:
     '''
     performs featire engineering using FeatureEngineer and selected strategy
+
+    steps(list):optional ordered [strategy,features] pairs run as one fused FeaturePipeline,
+                e.g. [["log",["Gr Liv Area"]],["standard_scaling",["Gr Liv Area","Lot Area"]]]
+    state_path(str):optional json file the fitted state is saved to,reload it with load_strategy
+                    to transform new data without refitting
+    sparse(bool):one-hot encode into pandas sparse columns,model_building_step keeps them sparse
+    cache_dir(str):optional directory of a per-column cache,unchanged columns of column-wise
+                   strategies are then served from disk instead of being recomputed
     '''
     #ensure features is a list,even if not provided
     if features is None:
         features = []#or raise and error if features are requires
-    if strategy=="log":
-        engineer=FeatureEngineer(LogTransformation(features))
-    elif strategy == "standard_scaling":
-        engineer = FeatureEngineer(StandardScaling(features))
-    elif strategy == "minmax_scaling":
-        engineer = FeatureEngineer(MinMaxScaling(features))
-    elif strategy == "onehot_encoding":
-        engineer = FeatureEngineer(OneHotEncoding(features))
+    if steps:
+        engineer=FeatureEngineer(FeaturePipeline([_make_strategy(name,step_features,sparse) for name,step_features in steps]))
     else:
-        raise ValueError(f"Unsupported feature engineering strategy: {strategy}")
+        engineer=FeatureEngineer(_make_strategy(strategy,features,sparse))
+
+    if state_path is None:
+        if cache_dir is not None:
+            engineer.set_strategy(MemoizedFeatureEngineeringStrategy(engineer._strategy,cache_dir=cache_dir))
+        transformed_df = engineer.apply_feature_engineering(df)
+        return transformed_df
 
-    transformed_df = engineer.apply_feature_engineering(df)
+    #fit once while transforming the training data and persist the compact state
+    transformed_df=engineer.apply_feature_engineering(df)
+    save_strategy(engineer._strategy,state_path)
     return transformed_df
-    
\ No newline at end of file
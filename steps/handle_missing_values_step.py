@@ -1,35 +1,52 @@
-import pandas as pd
-from zenml import step
-
-import sys
-import os
+from typing import Optional
 
-# Add the src folder to the system path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-
-# Now you can import the module
-from handling_missing_values import (
+import pandas as pd
+from src.handling_missing_values import (
     DropMissingValuesStrategy,
     FillMissingValuesStrategy,
+    KNNImputationStrategy,
     MissingValueHandler
-    )  # Replace with actual function or class
+    )
+from zenml import step
 
 # Use the function or class as needed
 MissingValueHandler(FillMissingValuesStrategy)
 
+#the label and row ids of the AmesHousing data,they are neither imputed nor used as neighbour features
+KNN_EXCLUDED_COLUMNS=["SalePrice","Order","PID"]
+
 
 @step
-def handle_missing_values_step(df:pd.DataFrame,strategy:str="mean")->pd.DataFrame:
+def handle_missing_values_step(
+    df:pd.DataFrame,
+    strategy:str="mean",
+    imputer_path:Optional[str]=None,
+    exclude_columns:Optional[list]=None,
+)->pd.DataFrame:
     '''
     handles missing values using MissingValueHandler and the specified strategy
+
+    imputer_path(str):when set,the strategy is fitted on df and saved there so serving
+                      fills missing values with the training statistics
+    exclude_columns(list):columns the knn strategy neither imputes nor measures distances on,
+                          defaults to the label and row ids
     '''
     if strategy=="drop":
         handler=MissingValueHandler(DropMissingValuesStrategy(axis=0))
 
     elif strategy in ["mean","median","mode","constant"]:
         handler=MissingValueHandler(FillMissingValuesStrategy(method=strategy))
+    elif strategy=="knn":
+        if exclude_columns is None:
+            exclude_columns=KNN_EXCLUDED_COLUMNS
+        handler=MissingValueHandler(KNNImputationStrategy(exclude_columns=exclude_columns))
     else:
         raise ValueError(f"Unsupported missing value handling stratgy:{strategy}")
 
-    cleaned_df=handler.handle_missing_values(df)
+    if imputer_path is not None:
+        handler.fit(df)
+        handler.strategy.save(imputer_path)
+        cleaned_df=handler.transform(df)
+    else:
+        cleaned_df=handler.handle_missing_values(df)
     return cleaned_df
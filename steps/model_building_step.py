@@ -2,13 +2,16 @@ import logging
 from typing import Annotated
 
 import mlflow
+import numpy as np
 import pandas as pd
 from sklearn.base import RegressorMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LinearRegression
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+from src.data_splitter import take_split
+from src.feature_engineering import hash_encode, hashed_feature_names, sparse_frame_to_csr
 from zenml import ArtifactConfig, step
 from zenml.client import Client
 
@@ -24,16 +27,20 @@ model = Model(
 )
 
 
-@step(enable_cache=False, experiment_tracker=experiment_tracker.name, model=model)
-def model_building_step(
-    X_train: pd.DataFrame, y_train: pd.Series
-) -> Annotated[Pipeline, ArtifactConfig(name="sklearn_pipeline", is_model_artifact=True)]:
+def _build_and_train(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    max_onehot_cardinality: int = 1000,
+    hash_features: int = 2**12,
+) -> Pipeline:
     """
     Builds and trains a Linear Regression model using scikit-learn wrapped in a pipeline.
 
     Parameters:
     X_train (pd.DataFrame): The training data features.
     y_train (pd.Series): The training data labels/target.
+    max_onehot_cardinality (int): Categorical columns with more distinct values are hashed instead of one-hot encoded.
+    hash_features (int): The fixed number of columns the high-cardinality categoricals are hashed into.
 
     Returns:
     Pipeline: The trained scikit-learn pipeline including preprocessing and the Linear Regression model.
@@ -44,12 +51,22 @@ def model_building_step(
     if not isinstance(y_train, pd.Series):
         raise TypeError("y_train must be a pandas Series.")
 
-    # Identify categorical and numerical columns
+    # Identify categorical, numerical and already sparse (e.g. sparse one-hot encoded) columns
+    sparse_cols = X_train.columns[
+        [isinstance(dtype, pd.SparseDtype) for dtype in X_train.dtypes]
+    ]
     categorical_cols = X_train.select_dtypes(include=["object", "category"]).columns
-    numerical_cols = X_train.select_dtypes(exclude=["object", "category"]).columns
+    cardinality = X_train[categorical_cols].nunique().to_numpy()
+    high_cardinality_cols = categorical_cols[cardinality > max_onehot_cardinality]
+    categorical_cols = categorical_cols.difference(high_cardinality_cols, sort=False)
+    numerical_cols = X_train.select_dtypes(exclude=["object", "category"]).columns.difference(
+        sparse_cols, sort=False
+    )
 
     logging.info(f"Categorical columns: {categorical_cols.tolist()}")
     logging.info(f"Numerical columns: {numerical_cols.tolist()}")
+    logging.info(f"Hashed columns: {high_cardinality_cols.tolist()}")
+    logging.info(f"Sparse columns: {sparse_cols.tolist()}")
 
     # Define preprocessing for categorical and numerical features
     numerical_transformer = SimpleImputer(strategy="mean")
@@ -60,12 +77,34 @@ def model_building_step(
         ]
     )
 
+    # Sparse columns are handed over as CSR, a plain passthrough would densify them
+    sparse_transformer = FunctionTransformer(
+        sparse_frame_to_csr, accept_sparse=True, feature_names_out="one-to-one"
+    )
+
+    # High-cardinality categoricals are hashed into a fixed width, so no vocabulary is fitted
+    hashing_transformer = FunctionTransformer(
+        hash_encode,
+        kw_args={"n_features": hash_features},
+        accept_sparse=True,
+        feature_names_out=hashed_feature_names,
+    )
+
     # Bundle preprocessing for numerical and categorical data
+    transformers = [
+        ("num", numerical_transformer, numerical_cols),
+        ("cat", categorical_transformer, categorical_cols),
+    ]
+    # Only added when there are columns for them, so the saved pipeline does not need them otherwise
+    if len(high_cardinality_cols):
+        transformers.append(("hash", hashing_transformer, high_cardinality_cols))
+    if len(sparse_cols):
+        transformers.append(("sparse", sparse_transformer, sparse_cols))
+    # The output only stays sparse when sparse or hashed columns make a dense one too wide, otherwise
+    # the one-hot block is densified so LinearRegression solves the unscaled features exactly
+    sparse_output = len(sparse_cols) > 0 or len(high_cardinality_cols) > 0
     preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", numerical_transformer, numerical_cols),
-            ("cat", categorical_transformer, categorical_cols),
-        ]
+        transformers=transformers, sparse_threshold=1.0 if sparse_output else 0.0
     )
 
     # Define the model training pipeline
@@ -84,13 +123,7 @@ def model_building_step(
         logging.info("Model training completed.")
 
         # Log the columns that the model expects
-        onehot_encoder = (
-            pipeline.named_steps["preprocessor"].transformers_[1][1].named_steps["onehot"]
-        )
-        onehot_encoder.fit(X_train[categorical_cols])
-        expected_columns = numerical_cols.tolist() + list(
-            onehot_encoder.get_feature_names_out(categorical_cols)
-        )
+        expected_columns = list(pipeline.named_steps["preprocessor"].get_feature_names_out())
         logging.info(f"Model expects the following columns: {expected_columns}")
 
     except Exception as e:
@@ -102,3 +135,52 @@ def model_building_step(
         mlflow.end_run()
 
     return pipeline
+
+
+@step(enable_cache=False, experiment_tracker=experiment_tracker.name, model=model)
+def model_building_step(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    max_onehot_cardinality: int = 1000,
+    hash_features: int = 2**12,
+) -> Annotated[Pipeline, ArtifactConfig(name="sklearn_pipeline", is_model_artifact=True)]:
+    """
+    Builds and trains a Linear Regression model using scikit-learn wrapped in a pipeline.
+
+    Parameters:
+    X_train (pd.DataFrame): The training data features.
+    y_train (pd.Series): The training data labels/target.
+    max_onehot_cardinality (int): Categorical columns with more distinct values are hashed instead of one-hot encoded.
+    hash_features (int): The fixed number of columns the high-cardinality categoricals are hashed into.
+
+    Returns:
+    Pipeline: The trained scikit-learn pipeline including preprocessing and the Linear Regression model.
+    """
+    return _build_and_train(X_train, y_train, max_onehot_cardinality, hash_features)
+
+
+@step(enable_cache=False, experiment_tracker=experiment_tracker.name, model=model)
+def model_building_from_indices_step(
+    df: pd.DataFrame,
+    train_indices: np.ndarray,
+    target_column: str,
+    max_onehot_cardinality: int = 1000,
+    hash_features: int = 2**12,
+) -> Annotated[Pipeline, ArtifactConfig(name="sklearn_pipeline", is_model_artifact=True)]:
+    """
+    Builds and trains the model on the training rows of a frame, taken inside the step.
+
+    Only the frame and the row indices are stored as artifacts, no copy of the training split.
+
+    Parameters:
+    df (pd.DataFrame): The frame the indices were computed on, including the target column.
+    train_indices (np.ndarray): The training row positions, e.g. from data_split_indices_step.
+    target_column (str): The name of the target column.
+    max_onehot_cardinality (int): Categorical columns with more distinct values are hashed instead of one-hot encoded.
+    hash_features (int): The fixed number of columns the high-cardinality categoricals are hashed into.
+
+    Returns:
+    Pipeline: The trained scikit-learn pipeline including preprocessing and the Linear Regression model.
+    """
+    X_train, y_train = take_split(df, train_indices, target_column)
+    return _build_and_train(X_train, y_train, max_onehot_cardinality, hash_features)
@@ -1,16 +1,21 @@
 import logging
-from typing import Tuple
+from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
-from src.model_evaluator import ModelEvaluator, RegressionModelEvaluationStrategy
+from src.data_splitter import (
+    DataSplitter,
+    KFoldSplitStrategy,
+    RepeatedKFoldSplitStrategy,
+    StratifiedByPriceBinSplitStrategy,
+    take_split,
+)
+from src.model_evaluator import ModelEvaluator, RegressionModelEvaluationStrategy, cross_validate
 from zenml import step
 
 
-@step(enable_cache=False)
-def model_evaluator_step(
-    trained_model: Pipeline, X_test: pd.DataFrame, y_test: pd.Series
-) -> Tuple[dict, float]:
+def _evaluate(trained_model: Pipeline, X_test: pd.DataFrame, y_test: pd.Series) -> Tuple[dict, float]:
     """
     Evaluates the trained model using ModelEvaluator and RegressionModelEvaluationStrategy.
 
@@ -46,3 +51,82 @@ def model_evaluator_step(
         raise ValueError("Evaluation metrics must be returned as a dictionary.")
     mse = evaluation_metrics.get("Mean Squared Error", None)
     return evaluation_metrics, mse
+
+
+@step(enable_cache=False)
+def model_evaluator_step(
+    trained_model: Pipeline, X_test: pd.DataFrame, y_test: pd.Series
+) -> Tuple[dict, float]:
+    """
+    Evaluates the trained model using ModelEvaluator and RegressionModelEvaluationStrategy.
+
+    Parameters:
+    trained_model (Pipeline): The trained pipeline containing the model and preprocessing steps.
+    X_test (pd.DataFrame): The test data features.
+    y_test (pd.Series): The test data labels/target.
+
+    Returns:
+    dict: A dictionary containing evaluation metrics.
+    """
+    return _evaluate(trained_model, X_test, y_test)
+
+
+@step(enable_cache=False)
+def model_evaluator_from_indices_step(
+    trained_model: Pipeline, df: pd.DataFrame, test_indices: np.ndarray, target_column: str
+) -> Tuple[dict, float]:
+    """
+    Evaluates the trained model on the test rows of a frame, taken inside the step.
+
+    Parameters:
+    trained_model (Pipeline): The trained pipeline containing the model and preprocessing steps.
+    df (pd.DataFrame): The frame the indices were computed on, including the target column.
+    test_indices (np.ndarray): The testing row positions, e.g. from data_split_indices_step.
+    target_column (str): The name of the target column.
+
+    Returns:
+    dict: A dictionary containing evaluation metrics.
+    """
+    X_test, y_test = take_split(df, test_indices, target_column)
+    return _evaluate(trained_model, X_test, y_test)
+
+
+@step(enable_cache=False)
+def cross_validation_step(
+    trained_model: Pipeline,
+    X: pd.DataFrame,
+    y: pd.Series,
+    strategy: str = "kfold",
+    n_splits: int = 5,
+    n_jobs: Optional[int] = None,
+) -> dict:
+    """
+    Cross-validates the trained pipeline with folds running in parallel workers.
+
+    The raw features are published once in shared memory, so every worker reads the same copy,
+    and every fold fits a fresh clone of the whole pipeline, preprocessing included, on its own
+    training rows.
+
+    Parameters:
+    trained_model (Pipeline): The trained pipeline, only its unfitted configuration is used.
+    X (pd.DataFrame): The data features.
+    y (pd.Series): The data labels/target.
+    strategy (str): 'kfold', 'stratified' (by price bins) or 'repeated_kfold'.
+    n_splits (int): The number of folds.
+    n_jobs (int): Number of worker processes, None uses every core.
+
+    Returns:
+    dict: The per fold metrics and their mean.
+    """
+    if strategy == "kfold":
+        splitter = DataSplitter(KFoldSplitStrategy(n_splits=n_splits))
+    elif strategy == "stratified":
+        splitter = DataSplitter(StratifiedByPriceBinSplitStrategy(n_splits=n_splits))
+    elif strategy == "repeated_kfold":
+        splitter = DataSplitter(RepeatedKFoldSplitStrategy(n_splits=n_splits))
+    else:
+        raise ValueError(f"Unsupported cross-validation strategy: {strategy}")
+
+    target_column = y.name or "target"
+    folds = splitter.split_indices(y.to_frame(target_column), target_column)
+    return cross_validate(trained_model, X, y.to_numpy(), folds, n_jobs=n_jobs)
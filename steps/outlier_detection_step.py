@@ -1,12 +1,36 @@
 import logging
+from typing import Optional
+
 import pandas as pd
-from src.outlier_detection import OutlierDetector, ZScoreOutlierDetection
+from src.outlier_detection import (
+    IQROutlierDetection,
+    OutlierDetector,
+    RobustMahalanobisOutlierDetection,
+    ZScoreOutlierDetection,
+)
 from zenml import step
 
 @step
-def outlier_detection_step(df:pd.DataFrame,column_name:str)->pd.DataFrame:
+def outlier_detection_step(
+    df:pd.DataFrame,
+    column_name:Optional[str]=None,
+    columns:Optional[list]=None,
+    method:str="remove",
+    strategy:str="zscore",
+    detector_path:Optional[str]=None,
+)->pd.DataFrame:
     '''
     detects and removes outlires using OutlierDetector
+
+    only the tested columns decide which rows are outliers,every column of the frame is returned
+
+    column_name(str):the column to test
+    columns(list):several columns to test,takes precedence over column_name,
+                  every numeric column is tested when neither is given
+    method(str):'remove' drops outlier rows,'cap' clips the tested columns
+    strategy(str):'zscore','iqr' or 'mahalanobis' for the multivariate robust Mahalanobis distance
+    detector_path(str):optional file the fitted detector is saved to,so serving can reload it
+                       with OutlierDetectionStrategy.load and flag requests
     '''
     logging.info(f"starting outlier detection step with dataframe of shape:{df.shape}")
 
@@ -18,13 +42,25 @@ def outlier_detection_step(df:pd.DataFrame,column_name:str)->pd.DataFrame:
         logging.error(f"Expected pandas DataFrame, got {type(df)} instead.")
         raise ValueError("Input df must be a pandas DataFrame.")
 
-    if column_name not in df.columns:
-        logging.error(f"Column '{column_name}' does not exist in the DataFrame.")
-        raise ValueError(f"Column '{column_name}' does not exist in the DataFrame.")
-        # Ensure only numeric columns are passed
-    df_numeric = df.select_dtypes(include=[int, float])
+    if columns is None and column_name is not None:
+        columns=[column_name]
+    for column in columns or []:
+        if column not in df.columns:
+            logging.error(f"Column '{column}' does not exist in the DataFrame.")
+            raise ValueError(f"Column '{column}' does not exist in the DataFrame.")
+
+    if strategy == "zscore":
+        outlier_detector = OutlierDetector(ZScoreOutlierDetection(threshold=3))
+    elif strategy == "iqr":
+        outlier_detector = OutlierDetector(IQROutlierDetection())
+    elif strategy == "mahalanobis":
+        outlier_detector = OutlierDetector(RobustMahalanobisOutlierDetection())
+    else:
+        raise ValueError(f"Unsupported outlier detection strategy: {strategy}")
 
-    outlier_detector = OutlierDetector(ZScoreOutlierDetection(threshold=3))
-    outliers = outlier_detector.detect_outliers(df_numeric)
-    df_cleaned = outlier_detector.handle_outliers(df_numeric, method="remove")
+    tested = df[columns] if columns is not None else df.select_dtypes(include="number")
+    outlier_detector.fit(tested)
+    if detector_path is not None:
+        outlier_detector._strategy.save(detector_path)
+    df_cleaned = outlier_detector.handle_outliers(df, method=method, columns=tested.columns.tolist())
     return df_cleaned
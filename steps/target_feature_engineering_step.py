@@ -0,0 +1,53 @@
+from typing import Optional, Tuple
+
+import pandas as pd
+from src.feature_engineering import(
+    FeatureEngineer,
+    NeighborhoodPricePerSqft,
+    TargetEncoding,
+    save_strategy,
+)
+from zenml import step
+
+#features learned from the target,they run after the split so test targets never reach them
+TARGET_FEATURES={
+    "neighborhood_price_per_sqft":NeighborhoodPricePerSqft,
+}
+
+
+def _make_target_strategy(strategy:str,features:list,target:str):
+    '''returns the target-derived FeatureEngineeringStrategy registered under the given name'''
+    if strategy=="target_encoding":
+        return TargetEncoding(features,target=target)
+    elif strategy in TARGET_FEATURES:
+        return TARGET_FEATURES[strategy](features) if features else TARGET_FEATURES[strategy]()
+    raise ValueError(f"Unsupported target feature engineering strategy: {strategy}")
+
+
+@step
+def target_feature_engineering_step(
+    X_train:pd.DataFrame,
+    X_test:pd.DataFrame,
+    y_train:pd.Series,
+    strategy:str="neighborhood_price_per_sqft",
+    features:Optional[list]=None,
+    state_path:Optional[str]=None,
+)->Tuple[pd.DataFrame,pd.DataFrame]:
+    '''
+    derives features from the target after the split,'target_encoding' encodes the given categorical
+    features and the derived features default to the AmesHousing input columns
+
+    the strategy is fitted on the training split only,the training rows get their out-of-fold
+    values and the test rows go through transform,like serving data would
+
+    state_path(str):optional json file the fitted state is saved to,reload it with load_strategy
+                    to transform new data without refitting
+    '''
+    engineer=FeatureEngineer(_make_target_strategy(strategy,features or [],y_train.name))
+    #the target rides along for the fit only and is dropped again
+    train=X_train.assign(**{y_train.name:y_train})
+    X_train_transformed=engineer.apply_feature_engineering(train).drop(columns=[y_train.name])
+    X_test_transformed=engineer._strategy.transform(X_test)
+    if state_path is not None:
+        save_strategy(engineer._strategy,state_path)
+    return X_train_transformed,X_test_transformed
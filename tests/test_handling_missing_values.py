@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0,os.path.abspath(os.path.join(os.path.dirname(__file__),"..")))
+
+from src.handling_missing_values import KNNImputationStrategy, MissingValueHandlingStrategy
+from src.ingest_data import ZipDataIngestor
+
+ARCHIVE=os.path.join(os.path.dirname(__file__),"..","data","archive.zip")
+
+
+@pytest.fixture(scope="module")
+def ames()->pd.DataFrame:
+    return ZipDataIngestor().ingest(ARCHIVE)
+
+
+def test_knn_imputer_transforms_serving_rows_without_the_label(ames,tmp_path):
+    strategy=KNNImputationStrategy(exclude_columns=["SalePrice","Order","PID"]).fit(ames)
+    assert not {"SalePrice","Order","PID"}&set(strategy.feature_columns_+strategy.target_columns_)
+
+    path=str(tmp_path/"imputer.joblib")
+    strategy.save(path)
+    imputer=MissingValueHandlingStrategy.load(path)
+
+    #a serving payload carries the features only
+    batch=ames[ames[imputer.target_columns_].isna().any(axis=1)].head(50).drop(columns=["SalePrice"])
+    filled=imputer.transform(batch)
+    assert not filled[imputer.target_columns_].isna().to_numpy().any()
+    assert filled.columns.equals(batch.columns)
+    np.testing.assert_array_equal(filled["Gr Liv Area"].to_numpy(),batch["Gr Liv Area"].to_numpy())
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0,os.path.abspath(os.path.join(os.path.dirname(__file__),"..")))
+
+from src.handling_missing_values import FillMissingValuesStrategy
+from src.ingest_data import ZipDataIngestor
+from src.streaming_statistics import FrameStatistics
+
+ARCHIVE=os.path.join(os.path.dirname(__file__),"..","data","archive.zip")
+
+
+@pytest.fixture(scope="module")
+def ames()->pd.DataFrame:
+    return ZipDataIngestor().ingest(ARCHIVE)
+
+
+def fit_chunks(method:str,chunksize:int,n_jobs:int)->dict:
+    chunks=ZipDataIngestor().ingest_chunks(ARCHIVE,chunksize=chunksize)
+    return FillMissingValuesStrategy(method).fit_chunks(chunks,n_jobs=n_jobs).fill_values_
+
+
+@pytest.mark.parametrize("n_jobs",[1,2])
+@pytest.mark.parametrize("chunksize",[100,500,1000])
+def test_mean_over_chunks_matches_full_data(ames,chunksize,n_jobs):
+    #Pool QC is all missing in the first chunks and text later on,it must not be tracked
+    fill_values=fit_chunks("mean",chunksize,n_jobs)
+    assert "Pool QC" not in fill_values
+    assert "Lot Frontage" in fill_values
+    columns=list(fill_values)
+    np.testing.assert_allclose([fill_values[column] for column in columns],ames[columns].mean().to_numpy())
+
+
+@pytest.mark.parametrize("n_jobs",[1,2])
+@pytest.mark.parametrize("chunksize",[100,500,1000])
+def test_median_over_chunks_is_close_to_full_data(ames,chunksize,n_jobs):
+    fill_values=fit_chunks("median",chunksize,n_jobs)
+    assert "Pool QC" not in fill_values
+    for column,value in fill_values.items():
+        values=ames[column].dropna()
+        #the sketch median is within a few percent of rank of the exact one
+        assert (values<value).mean()<=0.55 and (values<=value).mean()>=0.45,column
+
+
+def test_mode_over_chunks_matches_full_data(ames):
+    fill_values=fit_chunks("mode",500,2)
+    for column in ["Neighborhood","MS Zoning","Pool QC","Garage Type"]:
+        assert fill_values[column]==ames[column].mode().iloc[0]
+
+
+def test_merge_lines_columns_up_by_name():
+    first=FrameStatistics("mean").update(pd.DataFrame({"a":[1.0,3.0],"b":[10.0,np.nan]}))
+    second=FrameStatistics("mean").update(pd.DataFrame({"c":[7.0],"a":[5.0]}))
+    assert first.merge(second).fill_values()=={"a":3.0,"b":10.0,"c":7.0}